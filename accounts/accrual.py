@@ -0,0 +1,183 @@
+"""Set-based interest accrual for the nightly Celery job.
+
+Savings accounts are walked in primary-key chunks. Each chunk is read once,
+priced in one vectorized pass (``accounts.interest_batch``) that matches
+``Account.calculate_interest`` to the cent, and written back with a single
+balance UPDATE plus one ``bulk_create`` of interest transactions, all inside one
+atomic block.
+
+A nightly run is split into account-id shards (``InterestShard``) that Celery
+workers credit in parallel. Every shard checkpoints the last account id it
+credited in the same transaction as the credit, and the whole run is priced
+as of one ``InterestRun.as_of`` instant, so re-running a run (or a shard)
+never credits an account twice.
+"""
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from . import dashboard
+from .interest import interest_days
+from .interest_batch import accrued_interest_cents, from_cents, to_cents
+from .ledger import add_to_balances
+from .models import Account, InterestRun, InterestShard, Transaction
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_SHARD_SIZE = 50000
+
+
+@dataclass
+class AccrualResult:
+    accounts: int = 0
+    credited: int = 0
+    interest_total: Decimal = Decimal('0.00')
+    elapsed: float = 0.0
+
+    @property
+    def accounts_per_second(self):
+        return self.accounts / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'accounts': self.accounts,
+            'credited': self.credited,
+            'interest_total': str(self.interest_total),
+            'elapsed': round(self.elapsed, 3),
+            'accounts_per_second': round(self.accounts_per_second, 1),
+        }
+
+
+def savings_accounts_due():
+    return Account.objects.filter(account_type='savings', balance__gt=0)
+
+
+def accrue_chunk(rows, now):
+    """Credit interest for ``rows`` of (id, balance, created_at, last_interest_calculation).
+
+    Must run inside ``transaction.atomic``. Returns (credited, interest_total).
+    """
+    due = []
+    for account_id, balance, created_at, last_interest_calculation in rows:
+        days = interest_days(created_at, last_interest_calculation, now)
+        if days >= 1:
+            due.append((account_id, to_cents(balance), days))
+    if not due:
+        return 0, Decimal('0.00')
+
+    account_ids, balances, day_counts = zip(*due)
+    interest_cents = accrued_interest_cents(balances, day_counts)
+
+    deltas = {}
+    entries = []
+    for account_id, days, cents in zip(account_ids, day_counts, interest_cents.tolist()):
+        interest = from_cents(cents)
+        deltas[account_id] = interest
+        entries.append(Transaction(
+            account_id=account_id,
+            transaction_type='interest',
+            amount=interest,
+            signed_amount=interest,
+            description=f"Interest added for {days} days",
+        ))
+
+    add_to_balances(deltas, last_interest_calculation=now)
+    Transaction.objects.bulk_create(entries)
+    dashboard.invalidate_accounts(deltas)
+    return len(deltas), sum(deltas.values(), Decimal('0.00'))
+
+
+def accrue_interest(chunk_size=DEFAULT_CHUNK_SIZE, now=None, after_pk=0, last_pk=None, on_chunk=None):
+    """Credit interest to every savings account due, ``chunk_size`` accounts per transaction.
+
+    Only accounts with ``after_pk < pk <= last_pk`` are visited. ``on_chunk`` is
+    called inside each chunk's transaction with (last pk, accounts, credited,
+    interest_total) so callers can checkpoint atomically with the credit.
+    """
+    now = now or timezone.now()
+    result = AccrualResult()
+    started = time.perf_counter()
+    accounts = savings_accounts_due()
+    if last_pk is not None:
+        accounts = accounts.filter(pk__lte=last_pk)
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                accounts
+                .select_for_update()
+                .filter(pk__gt=after_pk)
+                .order_by('pk')
+                .values_list('pk', 'balance', 'created_at', 'last_interest_calculation')[:chunk_size]
+            )
+            if not rows:
+                break
+            credited, interest_total = accrue_chunk(rows, now)
+            after_pk = rows[-1][0]
+            if on_chunk is not None:
+                on_chunk(after_pk, len(rows), credited, interest_total)
+
+        result.accounts += len(rows)
+        result.credited += credited
+        result.interest_total += interest_total
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def plan_interest_run(run_date=None, shard_size=DEFAULT_SHARD_SIZE):
+    """Return the InterestRun for ``run_date``, splitting it into id-range shards on first call.
+
+    Re-planning an existing run returns it untouched, so a re-dispatch only
+    picks up the shards that have not finished.
+    """
+    run_date = run_date or timezone.localdate()
+    with transaction.atomic():
+        run, created = InterestRun.objects.select_for_update().get_or_create(
+            run_date=run_date, defaults={'as_of': timezone.now()},
+        )
+        if created:
+            bounds = savings_accounts_due().aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is not None:
+                InterestShard.objects.bulk_create([
+                    InterestShard(run=run, first_pk=first_pk, last_pk=min(first_pk + shard_size - 1, bounds['high']))
+                    for first_pk in range(bounds['low'], bounds['high'] + 1, shard_size)
+                ])
+    return run
+
+
+def run_interest_shard(shard_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Credit one shard, resuming after its checkpoint if an earlier attempt died."""
+    shard = InterestShard.objects.select_related('run').get(pk=shard_id)
+    if shard.status == 'done':
+        return AccrualResult()
+    InterestShard.objects.filter(pk=shard.pk).update(status='running')
+
+    def checkpoint(checkpoint_pk, accounts, credited, interest_total):
+        InterestShard.objects.filter(pk=shard.pk).update(
+            checkpoint_pk=checkpoint_pk,
+            accounts=F('accounts') + accounts,
+            credited=F('credited') + credited,
+            interest_total=F('interest_total') + interest_total,
+        )
+
+    after_pk = shard.checkpoint_pk if shard.checkpoint_pk is not None else shard.first_pk - 1
+    result = accrue_interest(
+        chunk_size=chunk_size,
+        now=shard.run.as_of,
+        after_pk=after_pk,
+        last_pk=shard.last_pk,
+        on_chunk=checkpoint,
+    )
+    InterestShard.objects.filter(pk=shard.pk).update(status='done', completed_at=timezone.now())
+    return result
+
+
+def finish_interest_run(run_id):
+    if InterestShard.objects.filter(run_id=run_id).exclude(status='done').exists():
+        return False
+    InterestRun.objects.filter(pk=run_id).update(status='done', finished_at=timezone.now())
+    return True
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Account, Transaction, Loan
+from . import dashboard, ledger
+from .models import Account, ArchivedTransaction, Transaction, Loan, InterestRun, InterestShard
+from .changelists import EstimatedCountPaginator, IndexedSearchMixin
+from .routing import ReplicaChangelistMixin
 
 # Customize the User admin
 class CustomUserAdmin(UserAdmin):
@@ -15,35 +19,101 @@ admin.site.register(User, CustomUserAdmin)
 
 # Register the Account model
 @admin.register(Account)
-class AccountAdmin(admin.ModelAdmin):
+class AccountAdmin(ReplicaChangelistMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'account_number', 'account_type', 'balance', 'status')
+    list_select_related = ('user',)
     search_fields = ('account_number', 'user__username')
     list_filter = ('account_type', 'status')
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ['close_accounts']
 
+    def get_readonly_fields(self, request, obj=None):
+        # Balances only move through the ledger so they stay in step with the journal
+        if getattr(settings, 'LEDGER_APPEND_ONLY', True):
+            return ('balance',)
+        return ()
+
     def close_accounts(self, request, queryset):
         queryset.update(status='closed')
+        dashboard.invalidate_users(*queryset.values_list('user_id', flat=True).distinct())
     close_accounts.short_description = "Close selected accounts"
 
 # Register the Transaction model
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ReplicaChangelistMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'account', 'transaction_type', 'amount', 'timestamp')
-    search_fields = ('account__account_number', 'transaction_type')
-    list_filter = ('transaction_type', 'timestamp')
+    # Account.__str__ shows the username
+    list_select_related = ('account__user',)
+    search_fields = ('account__account_number', 'account__user__username')
+    list_filter = ('transaction_type',)
+    date_hierarchy = 'timestamp'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # The journal is append-only (LEDGER_APPEND_ONLY)
+    def has_change_permission(self, request, obj=None):
+        return not getattr(settings, 'LEDGER_APPEND_ONLY', True) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not getattr(settings, 'LEDGER_APPEND_ONLY', True) and super().has_delete_permission(request, obj)
+
+# Archived transactions can only be read; accounts/archive.py moves them
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(ReplicaChangelistMixin, IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ('id', 'account', 'transaction_type', 'amount', 'timestamp', 'archive_month')
+    list_select_related = ('account__user',)
+    search_fields = ('account__account_number', 'account__user__username')
+    list_filter = ('transaction_type', 'archive_month')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 # Register the Loan model
 @admin.register(Loan)
-class LoanAdmin(admin.ModelAdmin):
+class LoanAdmin(ReplicaChangelistMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'amount', 'interest_rate', 'status', 'created_at')
-    search_fields = ('user__username', 'status')
-    list_filter = ('status', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'account__account_number')
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ['approve_loans', 'reject_loans']
 
     def approve_loans(self, request, queryset):
-        queryset.update(status='approved')
+        # Credits the accounts and sets total_amount/return_date, unlike a plain update()
+        approved = ledger.approve_loans(queryset)
+        self.message_user(request, f"{approved} loan(s) approved and disbursed.")
     approve_loans.short_description = "Approve selected loans"
 
     def reject_loans(self, request, queryset):
         queryset.update(status='rejected')
-    reject_loans.short_description = "Reject selected loans"
\ No newline at end of file
+        dashboard.invalidate_users(*queryset.values_list('user_id', flat=True).distinct())
+    reject_loans.short_description = "Reject selected loans"
+
+class InterestShardInline(admin.TabularInline):
+    model = InterestShard
+    extra = 0
+    can_delete = False
+    readonly_fields = ('first_pk', 'last_pk', 'checkpoint_pk', 'status', 'accounts', 'credited', 'interest_total', 'completed_at')
+
+# Register the InterestRun model (read-only progress of the nightly accrual)
+@admin.register(InterestRun)
+class InterestRunAdmin(admin.ModelAdmin):
+    list_display = ('run_date', 'status', 'as_of', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('run_date', 'as_of', 'status', 'started_at', 'finished_at', 'progress')
+    inlines = [InterestShardInline]
+
+    def progress(self, obj):
+        return obj.progress()
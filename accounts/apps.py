@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import connect_task_metrics
+        from .profiling import connect_task_profiling
+        from .routing import watch_writes
+        connect_task_metrics()
+        connect_task_profiling()
+        connection_created.connect(watch_writes, dispatch_uid='accounts.routing.watch_writes')
@@ -0,0 +1,199 @@
+"""Monthly archival of cold Transaction rows.
+
+``archive_transactions`` moves whole calendar months older than
+``TRANSACTION_ARCHIVE_MONTHS`` from ``Transaction`` into
+``ArchivedTransaction``. It works in batches of at most
+``TRANSACTION_ARCHIVE_BATCH_SIZE`` rows. Each batch is copied with one
+``INSERT ... SELECT`` and removed from the live table in the same
+transaction, so a row is always in exactly one of the two tables. The live
+table and its indexes then only hold recent history.
+
+Rows move unchanged, keeping their ids. Only entries at or before their
+account's latest ``BalanceCheckpoint`` are moved. Replaying the journal
+(``LEDGER_APPEND_ONLY``) therefore never needs an archived row, and an
+account's newest entries stay live until a checkpoint covers them.
+
+``Transaction.objects.with_archive()`` returns a ``History``. It reads both
+tables with ``UNION ALL`` and supports the calls the history pages,
+statements and loan repayments make: ``filter``, ``order_by``, a leading
+slice, ``values_list``, ``iterator``, ``len`` and iteration, sync or async. A
+sliced read is ordered and limited in each table, so a keyset page stays an
+index range scan on both. PostgreSQL does this inside the ``UNION``; on
+SQLite each table is bounded by an ``id IN (... LIMIT n)`` subquery. The home
+dashboard only shows the latest entries and keeps reading the live table.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import ArchivedTransaction, BalanceCheckpoint, Transaction
+
+DEFAULT_MONTHS = 12
+DEFAULT_BATCH_SIZE = 5000
+
+
+class History:
+    """Transaction and ArchivedTransaction rows as one queryset-like sequence."""
+
+    def __init__(self, live, archived, ordering=(), fields=None, flat=False, limit=None):
+        self.live = live
+        self.archived = archived
+        self.ordering = tuple(ordering)
+        self.fields = fields
+        self.flat = flat
+        self.limit = limit
+        self._result_cache = None
+
+    def _clone(self, **changes):
+        state = {
+            'live': self.live, 'archived': self.archived, 'ordering': self.ordering,
+            'fields': self.fields, 'flat': self.flat, 'limit': self.limit, **changes,
+        }
+        return History(**state)
+
+    def filter(self, *args, **kwargs):
+        return self._clone(live=self.live.filter(*args, **kwargs), archived=self.archived.filter(*args, **kwargs))
+
+    def order_by(self, *ordering):
+        return self._clone(ordering=ordering)
+
+    def values_list(self, *fields, flat=False):
+        return self._clone(fields=fields, flat=flat)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.start or key.step or key.stop is None:
+            raise TypeError("History only supports [:n] slices.")
+        return self._clone(limit=key.stop if self.limit is None else min(self.limit, key.stop))
+
+    def combined(self):
+        live, archived = self.live, self.archived
+        features = connections[live.db].features
+        sliced = self.limit is not None and self.ordering
+        if sliced and not features.supports_slicing_ordering_in_compound:
+            # The branches of a compound query cannot be ordered or limited here (SQLite); bound each to the
+            # ids of its own first rows instead, so neither table is read past the page
+            live = live.filter(pk__in=live.order_by(*self.ordering).values('pk')[:self.limit])
+            archived = archived.filter(pk__in=archived.order_by(*self.ordering).values('pk')[:self.limit])
+        if self.fields:
+            live, archived = live.values_list(*self.fields, flat=self.flat), archived.values_list(*self.fields, flat=self.flat)
+        else:
+            # Rows come back as Transaction instances; the archive month is the only extra column
+            archived = archived.defer('archive_month')
+        if sliced and features.supports_slicing_ordering_in_compound:
+            live, archived = live.order_by(*self.ordering)[:self.limit], archived.order_by(*self.ordering)[:self.limit]
+        else:
+            live, archived = live.order_by(), archived.order_by()
+        rows = live.union(archived, all=True)
+        if self.ordering:
+            rows = rows.order_by(*self.ordering)
+        if self.limit is not None:
+            rows = rows[:self.limit]
+        return rows
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = list(self.combined())
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self._fetch_all())
+
+    def __len__(self):
+        return len(self._fetch_all())
+
+    def __bool__(self):
+        return bool(self._fetch_all())
+
+    def __aiter__(self):
+        return self.combined().__aiter__()
+
+    def iterator(self, chunk_size=None):
+        return self.combined().iterator(chunk_size=chunk_size)
+
+
+def archive_horizon(months=None, today=None):
+    """First day of the oldest month that stays live."""
+    months = months if months is not None else getattr(settings, 'TRANSACTION_ARCHIVE_MONTHS', DEFAULT_MONTHS)
+    today = today or timezone.localdate()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_start(month):
+    return timezone.make_aware(datetime.combine(month, time.min))
+
+
+def archivable(start, end):
+    """Live entries recorded in [start, end) that their account's latest checkpoint covers."""
+    covered_to = BalanceCheckpoint.objects.filter(account=OuterRef('account')).order_by('-entry_id').values('entry_id')[:1]
+    return Transaction.objects.filter(
+        timestamp__gte=month_start(start), timestamp__lt=month_start(end), id__lte=Subquery(covered_to),
+    )
+
+
+@dataclass
+class ArchiveResult:
+    horizon: date
+    moved: int = 0
+    batches: int = 0
+    months: dict = field(default_factory=dict)
+
+    def as_dict(self):
+        return {
+            'horizon': self.horizon.isoformat(),
+            'moved': self.moved,
+            'batches': self.batches,
+            'months': {month.isoformat(): moved for month, moved in sorted(self.months.items())},
+        }
+
+
+def move_batch(ids, month):
+    """Copy the entries with ``ids`` into the archive and delete them from the live table."""
+    live = Transaction._meta
+    columns = ', '.join(connections['default'].ops.quote_name(f.column) for f in live.concrete_fields)
+    archive_table = connections['default'].ops.quote_name(ArchivedTransaction._meta.db_table)
+    live_table = connections['default'].ops.quote_name(live.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        with connections['default'].cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {archive_table} ({columns}, archive_month) "
+                f"SELECT {columns}, %s FROM {live_table} WHERE id IN ({placeholders})",
+                [month, *ids],
+            )
+        # No signals or cascades point at Transaction, so this is a single DELETE
+        Transaction.objects.filter(pk__in=ids).delete()
+
+
+def archive_transactions(months=None, batch_size=None, dry_run=False, today=None):
+    """Move every covered live entry older than the horizon into the archive, month by month."""
+    batch_size = batch_size or getattr(settings, 'TRANSACTION_ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    horizon = archive_horizon(months, today)
+    result = ArchiveResult(horizon)
+    oldest = Transaction.objects.filter(timestamp__lt=month_start(horizon)).order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return result
+    month = timezone.localtime(oldest).date().replace(day=1)
+    while month < horizon:
+        candidates = archivable(month, next_month(month))
+        if dry_run:
+            result.months[month] = candidates.count()
+        else:
+            while True:
+                ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+                if not ids:
+                    break
+                move_batch(ids, month)
+                result.batches += 1
+                result.months[month] = result.months.get(month, 0) + len(ids)
+        month = next_month(month)
+    result.moved = sum(result.months.values())
+    return result
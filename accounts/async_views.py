@@ -0,0 +1,102 @@
+"""Async versions of the read-heavy pages, served when ``ASYNC_VIEWS`` is on.
+
+The ASGI entry point turns ``ASYNC_VIEWS`` on. While one of these views
+waits on the database or the cache, it holds no worker thread. A slow client
+or a lagging replica therefore ties up a coroutine, not a slot in the
+worker pool.
+
+Queries that do not depend on each other are started together with
+``asyncio.gather``. Django still runs one request's ORM calls one after
+another on that request's own worker thread. The gather therefore saves only
+the hand-offs between them today. If the ORM gains concurrent queries, the
+views need no change to use them.
+
+Templates must not touch the database from async code, so every queryset is
+materialised before ``render``. Views that need the user replace the lazy
+``request.user`` with the loaded one, which the templates and the auth
+context processor read.
+"""
+import asyncio
+
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import aget_object_or_404, render
+
+from . import dashboard
+from .dashboard import alist
+from .models import Account, Loan, Transaction
+from .pagination import apaginate_request
+from .queries import query_budget
+from .routing import read_only_view
+from .views import home_context
+
+
+async def load_user(request):
+    request.user = await request.auser()
+    return request.user
+
+
+@query_budget(5)
+@login_required
+async def home(request):
+    user = await load_user(request)
+    dashboard_data = await dashboard.aget_dashboard(user)
+    return render(request, 'accounts/home.html', home_context(request, dashboard_data))
+
+
+@query_budget(4)
+@read_only_view
+@login_required
+async def transaction_history(request, account_id):
+    user = await load_user(request)
+    # The page is only shown once the account is found to belong to the user
+    account, transactions = await asyncio.gather(
+        aget_object_or_404(Account, id=account_id, user=user),
+        apaginate_request(request, Transaction.objects.with_archive().filter(account_id=account_id)),
+    )
+    return render(request, 'accounts/transaction_history.html', {'transactions': transactions, 'account': account})
+
+
+@query_budget(3)
+@read_only_view
+@login_required
+async def loan_status(request):
+    user = await load_user(request)
+    loans = await alist(Loan.objects.filter(user=user))
+    return render(request, 'accounts/loan_status.html', {'loans': loans})
+
+
+@query_budget(4)
+@read_only_view
+@login_required
+async def loan_details(request, loan_id):
+    user = await load_user(request)
+    # Repayments are only shown once the loan is found to belong to the user
+    loan, repayments = await asyncio.gather(
+        aget_object_or_404(Loan, id=loan_id, user=user),
+        alist(Transaction.objects.with_archive().filter(loan_id=loan_id, transaction_type='repayment').order_by('timestamp')),
+    )
+
+    return render(request, 'accounts/loan_details.html', {
+        'loan': loan,
+        'monthly_interest': (loan.amount * loan.interest_rate / 100) / 12,
+        'repayments': repayments,
+    })
+
+
+@query_budget(5)
+@read_only_view
+@login_required
+async def account_details(request, account_id):
+    user = await load_user(request)
+    # The page and the loans are only shown once the account is found to belong to the user
+    account, transactions, active_loans = await asyncio.gather(
+        aget_object_or_404(Account, id=account_id, user=user),
+        apaginate_request(request, Transaction.objects.with_archive().filter(account_id=account_id)),
+        alist(Loan.objects.filter(account_id=account_id, status='approved')),
+    )
+
+    return render(request, 'accounts/account_details.html', {
+        'account': account,
+        'transactions': transactions,
+        'active_loans': active_loans,
+    })
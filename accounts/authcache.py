@@ -0,0 +1,130 @@
+"""Per-process cache of the authenticated user.
+
+Django's ``AuthenticationMiddleware`` loads the session's ``User`` row on
+every request that looks at ``request.user``. ``CachedAuthenticationMiddleware``
+keeps that user for ``AUTH_USER_CACHE_SECONDS``. Entries are keyed on the
+session's user id, auth backend and session auth hash. The hash is derived
+from the password, so a session from before a password change never matches
+an entry stored after it. Every request gets its own copy of the cached
+user, so per-request state such as the permission cache is never shared.
+
+Saving or deleting a user, or changing the groups or permissions of users,
+drops the affected entries in this process at once (see ``signals.py``).
+Other processes drop them when they expire, so a deactivated user or a
+revoked staff flag can stay in effect there for up to the TTL. Keep it
+short. With ``AUTH_USER_CACHE_SECONDS = 0`` the middleware behaves exactly
+like Django's.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+MAX_ENTRIES = 10000
+
+
+def cache_seconds():
+    return getattr(settings, 'AUTH_USER_CACHE_SECONDS', 0)
+
+
+class UserCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.copy(entry[0])
+
+    def set(self, key, user, seconds):
+        with self._lock:
+            self._entries[key] = (copy.copy(user), time.monotonic() + seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        user_ids = {str(user_id) for user_id in user_ids}
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in user_ids]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+
+
+users = UserCache()
+
+
+def entry_key(user_id, backend_path, session_hash):
+    if user_id is None or backend_path is None or not session_hash:
+        return None
+    return str(user_id), backend_path, session_hash
+
+
+def session_entry_key(session):
+    return entry_key(session.get(SESSION_KEY), session.get(BACKEND_SESSION_KEY), session.get(HASH_SESSION_KEY))
+
+
+async def asession_entry_key(session):
+    return entry_key(
+        await session.aget(SESSION_KEY), await session.aget(BACKEND_SESSION_KEY), await session.aget(HASH_SESSION_KEY),
+    )
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        key = session_entry_key(request.session)
+        user = users.get(key) if key else None
+        if user is None:
+            user = auth.get_user(request)
+            # Stored under the hash the session holds now; get_user may have rotated it
+            key = session_entry_key(request.session) if user.is_authenticated else None
+            if key:
+                users.set(key, user, cache_seconds())
+        request._cached_user = user
+    return request._cached_user
+
+
+async def auser(request):
+    if not hasattr(request, '_acached_user'):
+        key = await asession_entry_key(request.session)
+        user = users.get(key) if key else None
+        if user is None:
+            user = await auth.aget_user(request)
+            key = await asession_entry_key(request.session) if user.is_authenticated else None
+            if key:
+                users.set(key, user, cache_seconds())
+        request._acached_user = user
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        if cache_seconds() > 0:
+            request.user = SimpleLazyObject(lambda: get_user(request))
+            request.auser = partial(auser, request)
@@ -0,0 +1,247 @@
+"""Request benchmark over a seeded database (see seeding.py).
+
+Each scenario drives one view through the Django test client as a logged-in
+seeded user. For every request it records the wall-clock latency and the
+number of SQL queries. It also records how many of those queries load the
+session and the user, which ``SESSION_MODE`` and ``AUTH_USER_CACHE_SECONDS``
+remove. The nightly interest task is run once in-process,
+shard by shard, the same way the Celery chord would run it. Reports are
+plain dicts so they can be written to JSON and compared across runs.
+"""
+import platform
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import authcache, throttle
+from .accrual import plan_interest_run
+from .models import Account, Loan
+from .tasks import calculate_interest_shard, finish_interest_run_task
+
+SCENARIOS = {}
+# Queries that only serve the session and request.user
+AUTH_QUERIES = {'session_queries': 'FROM "django_session"', 'user_queries': 'FROM "auth_user"'}
+
+
+@dataclass
+class Subject:
+    user: User
+    account: Account
+    payee_number: str = ''
+    loan: Loan = None
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+@scenario('home')
+def home(client, subject):
+    return client.get(reverse('home'))
+
+
+@scenario('account_details')
+def account_details(client, subject):
+    return client.get(reverse('account_details', args=[subject.account.pk]))
+
+
+@scenario('transaction_history')
+def transaction_history(client, subject):
+    return client.get(reverse('transaction_history', args=[subject.account.pk]))
+
+
+@scenario('transfer')
+def transfer(client, subject):
+    return client.post(reverse('transfer', args=[subject.account.pk]), {'amount': '0.01', 'to_account': subject.payee_number})
+
+
+@scenario('repay_loan')
+def repay_loan(client, subject):
+    return client.post(reverse('repay_loan', args=[subject.loan.pk]), {'amount': '0.01'})
+
+
+def percentiles(samples):
+    """Summary of latencies in seconds, reported in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else [ordered[0]] * 99
+    return {
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p90_ms': round(cuts[89] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def pick_subjects(prefix, count, random_seed=0):
+    """Seeded customers with their first account; payments go to a merchant account."""
+    rng = random.Random(random_seed)
+    user_ids = list(User.objects.filter(username__startswith=f"{prefix}-").exclude(
+        username__startswith=f"{prefix}-merchant-",
+    ).values_list('pk', flat=True))
+    payees = list(Account.objects.filter(user__username__startswith=f"{prefix}-merchant-").values_list('account_number', flat=True))
+    subjects = []
+    for user_id in rng.sample(user_ids, min(count, len(user_ids))):
+        account = Account.objects.select_related('user').filter(user_id=user_id).order_by('pk').first()
+        subjects.append(Subject(user=account.user, account=account, payee_number=rng.choice(payees) if payees else ''))
+    loans = Loan.objects.select_related('user', 'account').filter(
+        user__username__startswith=f"{prefix}-", status='approved', total_amount__gte=1,
+    ).order_by('pk')[:count]
+    borrowers = [Subject(user=loan.user, account=loan.account, loan=loan) for loan in loans]
+    return subjects, borrowers
+
+
+def measure(func, clients, subjects, iterations, warmup=3):
+    latencies = []
+    queries = []
+    auth_queries = {name: [] for name in AUTH_QUERIES}
+    statuses = {}
+    for i in range(warmup + iterations):
+        subject = subjects[i % len(subjects)]
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = func(clients[subject.user.pk], subject)
+            elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(len(captured.captured_queries))
+        for name, marker in AUTH_QUERIES.items():
+            auth_queries[name].append(sum(marker in query['sql'] for query in captured.captured_queries))
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    return {
+        'requests': len(latencies),
+        **percentiles(latencies),
+        'queries_mean': round(statistics.fmean(queries), 2),
+        'queries_max': max(queries),
+        **{f'{name}_mean': round(statistics.fmean(counts), 2) for name, counts in auth_queries.items()},
+        'status_codes': statuses,
+    }
+
+
+def run_interest():
+    """Plan and run today's interest run in-process through the task functions."""
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        run = plan_interest_run(timezone.localdate())
+        for shard_id in run.shards.exclude(status='done').values_list('pk', flat=True):
+            calculate_interest_shard(shard_id)
+        finish_interest_run_task(run.pk)
+        elapsed = time.perf_counter() - started
+    progress = run.progress()
+    return {
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'queries': len(captured.captured_queries),
+        'accounts': progress.get('accounts'),
+        'credited': progress.get('credited'),
+    }
+
+
+def cpu_median(func, attempts):
+    samples = []
+    for _ in range(attempts):
+        started = time.thread_time()
+        func()
+        samples.append(time.thread_time() - started)
+    return statistics.median(samples)
+
+
+def run_login_benchmark(attempts=5, host=None):
+    """CPU time per POST to the login view, by outcome, also in units of one password check."""
+    client = Client(HTTP_HOST=host or default_host())
+    url = reverse('login')
+    username, password = f"bench-login-{uuid.uuid4().hex[:8]}", uuid.uuid4().hex
+    user = User.objects.create_user(username, password=password)
+    try:
+        check = cpu_median(lambda: user.check_password('wrong'), attempts)
+        with override_settings(LOGIN_THROTTLE={'username': None, 'ip': None}):
+            success = cpu_median(lambda: (client.post(url, {'username': username, 'password': password}), client.logout()), attempts)
+            failure = cpu_median(lambda: client.post(url, {'username': username, 'password': 'wrong'}), attempts)
+        with override_settings(LOGIN_THROTTLE={'username': (0, 300), 'ip': None}):
+            response = client.post(url, {'username': username, 'password': 'wrong'})
+            if response.status_code != 429:
+                raise RuntimeError(f"over-limit login returned {response.status_code}, not 429")
+            shed = cpu_median(lambda: client.post(url, {'username': username, 'password': 'wrong'}), attempts)
+    finally:
+        throttle.reset(username)
+        user.delete()
+    return {
+        'attempts': attempts,
+        'password_check_ms': round(check * 1000, 3),
+        **{f'{name}_ms': round(value * 1000, 3) for name, value in (('success', success), ('failure', failure), ('shed', shed))},
+        **{f'{name}_checks': round(value / check, 2) for name, value in (('success', success), ('failure', failure), ('shed', shed))},
+    }
+
+
+def default_host():
+    # DEBUG with an empty ALLOWED_HOSTS accepts localhost
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def run_benchmark(scenarios=None, iterations=100, subjects=20, prefix='seed', warmup=3, interest=True, host=None):
+    scenarios = scenarios or list(SCENARIOS)
+    host = host or default_host()
+    customers, borrowers = pick_subjects(prefix, subjects)
+    if not customers:
+        raise ValueError(f"No seeded users with prefix {prefix!r}; run `manage.py seed` first.")
+    clients = {}
+    for subject in customers + borrowers:
+        if subject.user.pk not in clients:
+            clients[subject.user.pk] = Client(HTTP_HOST=host)
+            clients[subject.user.pk].force_login(subject.user)
+
+    results = {}
+    for name in scenarios:
+        pool = borrowers if name == 'repay_loan' else customers
+        if pool:
+            results[name] = measure(SCENARIOS[name], clients, pool, iterations, warmup)
+    if interest:
+        results['interest'] = run_interest()
+    return {
+        'meta': {
+            'started': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'session_engine': settings.SESSION_ENGINE,
+            'auth_user_cache_seconds': authcache.cache_seconds(),
+            'auth_user_cache': authcache.users.as_dict(),
+            'iterations': iterations,
+            'subjects': len(customers),
+        },
+        'scenarios': results,
+    }
+
+
+def compare(report, baseline, keys=('p50_ms', 'p95_ms', 'queries_mean', 'session_queries_mean', 'user_queries_mean', 'elapsed_ms', 'queries')):
+    """Rows of (scenario, key, baseline, current, change %) for the scenarios both reports have."""
+    rows = []
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        for key in keys:
+            if key in current and key in previous:
+                change = (current[key] - previous[key]) / previous[key] * 100 if previous[key] else 0.0
+                rows.append((name, key, previous[key], current[key], round(change, 1)))
+    return rows
@@ -0,0 +1,145 @@
+"""Per-user cache of the assembled ``home`` dashboard.
+
+Entries are keyed by a per-user version number. Invalidation bumps the
+version once the writing transaction commits, so a reader that rebuilt the
+dashboard from pre-commit data can only have stored it under a version that
+is never read again. Model saves invalidate through ``accounts.signals``;
+bulk and ``update()`` code paths, which send no signals, call
+``invalidate_users``/``invalidate_accounts`` themselves.
+
+``aget_dashboard`` is the same cache for the async views. On a miss it runs
+the three queries with ``asyncio.gather``.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Account, Loan, Transaction
+
+DEFAULT_TIMEOUT = 300
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f"dashboard:{user_id}:version"
+
+
+def _current_version(cache, user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh, never-used version so entries left from before an eviction are ignored
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _acurrent_version(cache, user_id):
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def dashboard_querysets(user):
+    return {
+        'accounts': Account.objects.filter(user=user),
+        'transactions': Transaction.objects.filter(account__user=user).select_related('account').order_by('-timestamp')[:3],
+        'pending_loans': Loan.objects.filter(user=user, status='pending'),
+    }
+
+
+def build_dashboard(user):
+    return {name: list(queryset) for name, queryset in dashboard_querysets(user).items()}
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
+
+
+async def abuild_dashboard(user):
+    querysets = dashboard_querysets(user)
+    rows = await asyncio.gather(*(alist(queryset) for queryset in querysets.values()))
+    return dict(zip(querysets, rows))
+
+
+def get_dashboard(user):
+    cache = get_cache()
+    key = f"dashboard:{user.pk}:{_current_version(cache, user.pk)}"
+    dashboard = cache.get(key)
+    if dashboard is not None:
+        stats.record('hits')
+        return dashboard
+    stats.record('misses')
+    dashboard = build_dashboard(user)
+    cache.set(key, dashboard, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    return dashboard
+
+
+async def aget_dashboard(user):
+    cache = get_cache()
+    key = f"dashboard:{user.pk}:{await _acurrent_version(cache, user.pk)}"
+    dashboard = await cache.aget(key)
+    if dashboard is not None:
+        stats.record('hits')
+        return dashboard
+    stats.record('misses')
+    dashboard = await abuild_dashboard(user)
+    await cache.aset(key, dashboard, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    return dashboard
+
+
+def _bump(user_ids):
+    cache = get_cache()
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns(), None)
+        stats.record('invalidations')
+
+
+def invalidate_users(*user_ids):
+    """Drop the cached dashboards of ``user_ids`` once the current transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+def invalidate_accounts(account_ids):
+    """Like invalidate_users, for the owners of ``account_ids`` (one query)."""
+    account_ids = list(account_ids)
+    if account_ids:
+        invalidate_users(*Account.objects.filter(pk__in=account_ids).values_list('user_id', flat=True).distinct())
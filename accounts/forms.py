@@ -27,6 +27,12 @@ class AccountForm(forms.ModelForm):
             raise forms.ValidationError("Account number must be exactly 14 digits.")
         return account_number
 
+# Open Account Form (the account number is allocated, see numbering.py)
+class OpenAccountForm(forms.ModelForm):
+    class Meta:
+        model = Account
+        fields = ['account_type']
+
 # Deposit Form
 class DepositForm(forms.ModelForm):
     class Meta:
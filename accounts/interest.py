@@ -0,0 +1,24 @@
+"""Interest arithmetic shared by the per-account and bulk accrual paths."""
+from decimal import Decimal, ROUND_HALF_EVEN
+
+INTEREST_RATE = Decimal('0.05')  # 5% annual interest rate
+DAYS_IN_YEAR = Decimal('365')
+CENT = Decimal('0.01')
+
+
+def interest_days(created_at, last_interest_calculation, now):
+    """Whole days elapsed since interest was last credited (or the account opened)."""
+    since = last_interest_calculation or created_at
+    return (now - since).days
+
+
+def accrued_interest(balance, days, rate=INTEREST_RATE, rounding=ROUND_HALF_EVEN):
+    """Simple daily interest on ``balance`` for ``days``, rounded to the cent.
+
+    The products are taken before the single division by 365 so the only
+    inexact step is one that cannot cross a half-cent boundary; this keeps the
+    result equal to the exact rational value rounded once, which is what
+    ``accounts.interest_batch`` computes in integer cents.
+    """
+    total_interest = balance * rate * Decimal(days) / DAYS_IN_YEAR
+    return total_interest.quantize(CENT, rounding=rounding)
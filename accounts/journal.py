@@ -0,0 +1,138 @@
+"""Balance journal: periodic checkpoints plus the signed entries after them.
+
+Every ``Transaction`` records its effect on the balance in ``signed_amount``
+and is never changed or deleted once written (``LEDGER_APPEND_ONLY``). A
+``BalanceCheckpoint`` fixes an account's balance after every entry up to
+``entry_id``, so
+
+    balance = latest checkpoint + sum(signed_amount of entries after it)
+
+Checkpoints are rolled up incrementally: each run picks a new global
+watermark (the newest entry older than ``LEDGER_CHECKPOINT_LAG_SECONDS``)
+and checkpoints only the accounts with entries since the previous one, so
+replaying, auditing or answering "balance as of X" touches only the entries
+after the nearest checkpoint. ``Account.balance`` stays as the projection
+the pages read; ``audit_balances``/``rebuild_balances`` check or restore it
+from the journal.
+
+Archival (archive.py) only moves entries an account's latest checkpoint
+already covers, so replaying from that checkpoint never needs the archive.
+Only ``balance_as_of`` can start from an older checkpoint, and it counts
+archived entries too.
+
+SQLite keeps decimals as floats, so sums there pick up binary noise
+(0.1 + 0.2 = 0.30000000000000004). Journal balances are rounded to the cent
+in SQL, compared against the rounded balance column, and quantized before
+they are written or returned.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from . import dashboard
+from .interest import CENT
+from .models import Account, ArchivedTransaction, BalanceCheckpoint, Transaction
+
+DEFAULT_LAG_SECONDS = 300
+DEFAULT_CHUNK_SIZE = 1000
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+
+class JournalUnavailable(Exception):
+    pass
+
+
+def with_journal_balance(accounts, up_to_entry=None):
+    """Annotate ``journal_balance`` on an Account queryset, one query for all rows.
+
+    With ``up_to_entry`` only entries with id <= up_to_entry are counted.
+    """
+    checkpoints = BalanceCheckpoint.objects.filter(account=OuterRef('pk')).order_by('-entry_id')
+    if up_to_entry is not None:
+        checkpoints = checkpoints.filter(entry_id__lte=up_to_entry)
+    accounts = accounts.annotate(
+        checkpoint_entry=Coalesce(Subquery(checkpoints.values('entry_id')[:1]), Value(0)),
+        checkpoint_balance=Coalesce(Subquery(checkpoints.values('balance')[:1], output_field=MONEY), ZERO),
+    )
+    entries = Transaction.objects.filter(account=OuterRef('pk'), id__gt=OuterRef('checkpoint_entry'))
+    if up_to_entry is not None:
+        entries = entries.filter(id__lte=up_to_entry)
+    entries_total = entries.order_by().values('account').annotate(total=Sum('signed_amount')).values('total')
+    return accounts.annotate(
+        journal_balance=Round(
+            F('checkpoint_balance') + Coalesce(Subquery(entries_total, output_field=MONEY), ZERO), 2, output_field=MONEY,
+        ),
+    )
+
+
+def balance_as_of(account, when):
+    """The account's balance after every entry recorded at or before ``when``."""
+    checkpoint = account.checkpoints.filter(as_of__lte=when).order_by('-entry_id').first()
+    if checkpoint is None:
+        if account.checkpoints.filter(is_opening=True).exists():
+            raise JournalUnavailable(f"The journal for account {account.pk} starts after {when}.")
+        base, entry_id = Decimal('0.00'), 0
+    else:
+        base, entry_id = checkpoint.balance, checkpoint.entry_id
+    total = base
+    for entries in (Transaction.objects, ArchivedTransaction.objects):
+        entries = entries.filter(account=account, id__gt=entry_id, timestamp__lte=when)
+        total += entries.aggregate(total=Sum('signed_amount'))['total'] or Decimal('0.00')
+    return total.quantize(CENT)
+
+
+def roll_checkpoints(lag_seconds=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Checkpoint every account with entries since the last watermark. Returns the number written."""
+    if lag_seconds is None:
+        lag_seconds = getattr(settings, 'LEDGER_CHECKPOINT_LAG_SECONDS', DEFAULT_LAG_SECONDS)
+    previous = BalanceCheckpoint.objects.aggregate(last=Max('entry_id'))['last'] or 0
+    watermark = (
+        Transaction.objects
+        .filter(id__gt=previous, timestamp__lte=timezone.now() - timedelta(seconds=lag_seconds))
+        .order_by('-id')
+        .values_list('id', 'timestamp')
+        .first()
+    )
+    if watermark is None:
+        return 0
+    entry_id, as_of = watermark
+
+    touched = sorted(set(
+        Transaction.objects.filter(id__gt=previous, id__lte=entry_id).values_list('account_id', flat=True).distinct()
+    ))
+    written = 0
+    for start in range(0, len(touched), chunk_size):
+        account_ids = touched[start:start + chunk_size]
+        balances = with_journal_balance(Account.objects.filter(pk__in=account_ids), up_to_entry=entry_id)
+        with transaction.atomic():
+            written += len(BalanceCheckpoint.objects.bulk_create([
+                BalanceCheckpoint(account_id=account_id, entry_id=entry_id, as_of=as_of, balance=balance.quantize(CENT))
+                for account_id, balance in balances.values_list('pk', 'journal_balance')
+            ], ignore_conflicts=True))
+    return written
+
+
+def audit_balances(accounts=None):
+    """Accounts whose balance column disagrees with the journal, as (id, balance, journal_balance)."""
+    accounts = with_journal_balance(accounts if accounts is not None else Account.objects.all())
+    mismatched = accounts.alias(cents=Round('balance', 2, output_field=MONEY)).exclude(cents=F('journal_balance'))
+    return [
+        (account_id, balance, journal_balance.quantize(CENT))
+        for account_id, balance, journal_balance in mismatched.values_list('pk', 'balance', 'journal_balance')
+    ]
+
+
+def rebuild_balances(accounts=None):
+    """Reset the balance column from the journal where they disagree. Returns the number fixed."""
+    mismatched = audit_balances(accounts)
+    with transaction.atomic():
+        for account_id, _, journal_balance in mismatched:
+            Account.objects.filter(pk=account_id).update(balance=journal_balance)
+        dashboard.invalidate_accounts([account_id for account_id, _, _ in mismatched])
+    return len(mismatched)
@@ -0,0 +1,256 @@
+"""Money movement: the only code that changes balances on behalf of a customer.
+
+Every operation runs in one database transaction. Balances change through
+``F()`` updates on the database row rather than read-modify-save in Python,
+and debits are conditional (``balance__gte=amount``) so two concurrent
+withdrawals cannot both pass the overdraft check. Operations touching two
+accounts lock them with ``select_for_update`` in ascending id order, so
+opposing transfers between the same pair cannot deadlock.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import dashboard
+from .metrics import track_movement
+from .models import Account, Loan, Transaction
+
+BALANCE_BATCH_SIZE = 500
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientBalance(LedgerError):
+    pass
+
+
+class SameAccountTransfer(LedgerError):
+    pass
+
+
+class LoanOverpayment(LedgerError):
+    pass
+
+
+def _check_amount(amount):
+    if amount is None or amount <= Decimal('0.00'):
+        raise LedgerError("Amount must be greater than 0.")
+
+
+def lock_accounts(*account_ids):
+    """Lock the given account rows, lowest id first, for the rest of the transaction.
+
+    Backends without row locks (SQLite) lock the whole database on the first
+    write, so there a no-op UPDATE takes that lock up front; a leading read
+    would leave the transaction as a reader that later fails to upgrade.
+    """
+    ids = sorted(set(account_ids))
+    if connection.features.has_select_for_update:
+        list(Account.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+    else:
+        Account.objects.filter(pk__in=ids).update(balance=F('balance'))
+
+
+def add_to_balances(deltas, batch_size=BALANCE_BATCH_SIZE, **fields):
+    """Apply {account_id: amount} increments with one CASE UPDATE per batch.
+
+    Extra keyword arguments are set on the same rows in the same UPDATE.
+    """
+    balance_field = Account._meta.get_field('balance')
+    items = list(deltas.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        increment = Case(
+            *[When(pk=account_id, then=Value(amount)) for account_id, amount in batch],
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=balance_field.max_digits, decimal_places=balance_field.decimal_places),
+        )
+        Account.objects.filter(pk__in=[account_id for account_id, _ in batch]).update(balance=F('balance') + increment, **fields)
+
+
+def credit(account_id, amount):
+    return Account.objects.filter(pk=account_id).update(balance=F('balance') + amount)
+
+
+def debit(account_id, amount):
+    if not Account.objects.filter(pk=account_id, balance__gte=amount).update(balance=F('balance') - amount):
+        raise InsufficientBalance("Insufficient balance")
+
+
+@track_movement('deposit')
+def deposit(account, amount, description=None):
+    _check_amount(amount)
+    with transaction.atomic():
+        if not credit(account.pk, amount):
+            raise Account.DoesNotExist
+        return Transaction.objects.create(account=account, transaction_type='deposit', amount=amount, signed_amount=amount, description=description)
+
+
+@track_movement('withdraw')
+def withdraw(account, amount, description=None):
+    _check_amount(amount)
+    with transaction.atomic():
+        debit(account.pk, amount)
+        return Transaction.objects.create(account=account, transaction_type='withdrawal', amount=amount, signed_amount=-amount, description=description)
+
+
+@track_movement('transfer')
+def transfer(source, destination, amount):
+    _check_amount(amount)
+    if source.pk == destination.pk:
+        raise SameAccountTransfer("Cannot transfer to the same account")
+    with transaction.atomic():
+        lock_accounts(source.pk, destination.pk)
+        debit(source.pk, amount)
+        credit(destination.pk, amount)
+        dashboard.invalidate_users(source.user_id, destination.user_id)
+        return Transaction.objects.bulk_create([
+            Transaction(account=source, transaction_type='transfer', amount=amount, signed_amount=-amount, description=f"Transferred to {destination.account_number}"),
+            Transaction(account=destination, transaction_type='transfer', amount=amount, signed_amount=amount, description=f"Received from {source.account_number}"),
+        ])
+
+
+@track_movement('repay_loan')
+def repay_loan(loan, amount):
+    """Debit ``amount`` from the loan's account and take it off the loan's total.
+
+    Marks the loan repaid once nothing is left to pay.
+    """
+    _check_amount(amount)
+    with transaction.atomic():
+        lock_accounts(loan.account_id)
+        if not Loan.objects.filter(pk=loan.pk, total_amount__gte=amount).update(total_amount=F('total_amount') - amount):
+            raise LoanOverpayment("Amount cannot exceed the total loan amount.")
+        debit(loan.account_id, amount)
+        if Loan.objects.filter(pk=loan.pk, total_amount__lte=Decimal('0.00')).update(status='repaid'):
+            previous_status, loan.status = loan.status, 'repaid'
+            loan.transitioned(previous_status)
+        dashboard.invalidate_users(loan.user_id)
+        return Transaction.objects.create(
+            account_id=loan.account_id,
+            transaction_type='repayment',
+            amount=amount,
+            signed_amount=-amount,
+            description=f"Repayment for Loan #{loan.id}",
+            loan=loan,
+        )
+
+
+@dataclass
+class TransferResult:
+    index: int
+    to_account: str
+    amount: Decimal
+    ok: bool
+    error: str = ''
+
+
+def transfer_batch(source, items):
+    """Settle many transfers out of ``source`` in one database transaction.
+
+    ``items`` is an iterable of (to_account_number, amount). Destinations are
+    resolved with one query, items are applied in order against the source's
+    locked balance, and each one succeeds or fails on its own; the balance
+    changes and paired transactions for the successful ones are written in
+    bulk. Returns one TransferResult per item.
+    """
+    items = list(items)
+    destinations = Account.objects.in_bulk({number for number, _ in items}, field_name='account_number')
+    results = []
+    with transaction.atomic():
+        lock_accounts(source.pk, *(account.pk for account in destinations.values()))
+        available = Account.objects.values_list('balance', flat=True).get(pk=source.pk)
+        credits = defaultdict(Decimal)
+        entries = []
+        for index, (number, amount) in enumerate(items):
+            destination = destinations.get(number)
+            if amount is None:
+                error = "Invalid amount."
+            elif amount <= Decimal('0.00'):
+                error = "Amount must be greater than 0."
+            elif destination is None:
+                error = "Account does not exist"
+            elif destination.pk == source.pk:
+                error = "Cannot transfer to the same account"
+            elif amount > available:
+                error = "Insufficient balance"
+            else:
+                error = ''
+            results.append(TransferResult(index, number, amount, not error, error))
+            if error:
+                continue
+
+            available -= amount
+            credits[destination.pk] += amount
+            entries.append(Transaction(account=source, transaction_type='transfer', amount=amount, signed_amount=-amount, description=f"Transferred to {number}"))
+            entries.append(Transaction(account=destination, transaction_type='transfer', amount=amount, signed_amount=amount, description=f"Received from {source.account_number}"))
+
+        if credits:
+            debit(source.pk, sum(credits.values()))
+            add_to_balances(credits)
+            Transaction.objects.bulk_create(entries, batch_size=BALANCE_BATCH_SIZE * 2)
+            dashboard.invalidate_accounts([source.pk, *credits])
+    return results
+
+
+def disburse_loan(loan):
+    """Credit a just-approved loan to its account (``Loan.on_approved``)."""
+    with transaction.atomic():
+        credit(loan.account_id, loan.amount)
+        return Transaction.objects.create(
+            account_id=loan.account_id,
+            transaction_type='disbursement',
+            amount=loan.amount,
+            signed_amount=loan.amount,
+            description=f"Disbursement for Loan #{loan.id}",
+            loan=loan,
+        )
+
+
+def approve_loans(loans):
+    """Approve and disburse every loan in ``loans`` that is not already approved or repaid.
+
+    Terms are computed in one pass, the loans are written with one
+    ``bulk_update``, accounts are credited with one increment per account
+    (summing loans that share it) and the disbursement transactions are
+    inserted in bulk, all in one transaction. This is the set-based
+    equivalent of saving each loan through ``Loan.on_approved``; per-loan
+    hooks are not run. Returns the number approved.
+    """
+    with transaction.atomic():
+        pending = list(
+            Loan.objects.select_for_update()
+            .filter(pk__in=loans.values('pk'))
+            .exclude(status__in=['approved', 'repaid'])
+            .order_by('pk')
+        )
+        if not pending:
+            return 0
+        lock_accounts(*(loan.account_id for loan in pending))
+
+        credits = defaultdict(Decimal)
+        entries = []
+        for loan in pending:
+            loan.status = 'approved'
+            loan.set_approval_terms()
+            credits[loan.account_id] += loan.amount
+            entries.append(Transaction(
+                account_id=loan.account_id,
+                transaction_type='disbursement',
+                amount=loan.amount,
+                signed_amount=loan.amount,
+                description=f"Disbursement for Loan #{loan.id}",
+                loan=loan,
+            ))
+
+        Loan.objects.bulk_update(pending, ['status', 'total_amount', 'return_date'], batch_size=BALANCE_BATCH_SIZE)
+        add_to_balances(credits)
+        Transaction.objects.bulk_create(entries, batch_size=BALANCE_BATCH_SIZE)
+        dashboard.invalidate_users(*(loan.user_id for loan in pending))
+        dashboard.invalidate_accounts(credits)
+    return len(pending)
@@ -0,0 +1,243 @@
+"""Concurrent load test of the read-heavy pages under WSGI and under ASGI.
+
+No web server is needed. Requests go straight to Django's handlers:
+
+* ``wsgi`` runs ``WSGIHandler`` on a fixed pool of ``workers`` threads, as a
+  threaded WSGI server (gunicorn ``--threads``) does. A request that finds
+  every worker busy waits in the queue, and that wait counts in its latency.
+* ``asgi`` runs ``ASGIHandler`` for every request as a coroutine on one
+  event loop, as uvicorn does. Run it with ``ASYNC_VIEWS`` on so the async
+  views are routed.
+
+``concurrency`` clients send requests back to back over seeded customers'
+sessions (see benchmark.py). ``db_latency`` adds a sleep to every query, as
+a distant replica would. ``client_delay`` holds each response that long
+before it counts as delivered, as a slow client does. A WSGI worker is
+blocked for that time; an ASGI request only waits in ``send``.
+"""
+import asyncio
+import io
+import platform
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmark import default_host, percentiles, pick_subjects
+
+MODES = ('wsgi', 'asgi')
+
+
+@dataclass
+class Request:
+    scenario: str
+    path: str
+    cookie: str
+
+
+def build_requests(prefix, subjects):
+    """One GET per read-heavy page and seeded customer, with that customer's session cookie."""
+    customers, borrowers = pick_subjects(prefix, subjects)
+    if not customers:
+        raise ValueError(f"No seeded users with prefix {prefix!r}; run `manage.py seed` first.")
+    cookies = {}
+    for subject in customers + borrowers:
+        if subject.user.pk not in cookies:
+            client = Client()
+            client.force_login(subject.user)
+            cookies[subject.user.pk] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+    requests = []
+    for subject in customers:
+        cookie = cookies[subject.user.pk]
+        requests += [
+            Request('home', reverse('home'), cookie),
+            Request('account_details', reverse('account_details', args=[subject.account.pk]), cookie),
+            Request('transaction_history', reverse('transaction_history', args=[subject.account.pk]), cookie),
+            Request('loan_status', reverse('loan_status'), cookie),
+        ]
+    for subject in borrowers:
+        requests.append(Request('loan_details', reverse('loan_details', args=[subject.loan.pk]), cookies[subject.user.pk]))
+    return requests
+
+
+def add_db_latency(seconds):
+    """Sleep ``seconds`` before every query on every connection opened from now on."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False, dispatch_uid='accounts.loadtest.db_latency')
+
+
+def run_wsgi(requests, total, concurrency, workers, host, client_delay):
+    application = get_wsgi_application()
+
+    def handle(request):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': request.path,
+            'QUERY_STRING': '',
+            'HTTP_HOST': host,
+            'HTTP_COOKIE': request.cookie,
+            'wsgi.input': io.BytesIO(),
+        }
+        setup_testing_defaults(environ)
+        status = []
+        body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+        try:
+            for _ in body:
+                pass
+            if client_delay:
+                time.sleep(client_delay)  # the worker writes to the slow socket until it drains
+        finally:
+            getattr(body, 'close', lambda: None)()
+        return int(status[0].split()[0])
+
+    work = queue.Queue()
+    for i in range(total):
+        work.put(requests[i % len(requests)])
+    results = []
+    lock = threading.Lock()
+
+    def client(server):
+        while True:
+            try:
+                request = work.get_nowait()
+            except queue.Empty:
+                return
+            started = time.perf_counter()
+            status = server.submit(handle, request).result()
+            with lock:
+                results.append((request.scenario, status, time.perf_counter() - started))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wsgi-worker') as server:
+        clients = [threading.Thread(target=client, args=(server,)) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def run_asgi(requests, total, concurrency, host, client_delay):
+    application = get_asgi_application()
+
+    async def handle(request):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': request.path,
+            'raw_path': request.path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', host.encode()), (b'cookie', request.cookie.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': (host, 80),
+        }
+        done = asyncio.Event()
+        received = False
+        status = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                if client_delay:
+                    await asyncio.sleep(client_delay)
+                done.set()
+
+        await application(scope, receive, send)
+        return status[0]
+
+    async def main():
+        work = asyncio.Queue()
+        for i in range(total):
+            work.put_nowait(requests[i % len(requests)])
+        results = []
+
+        async def client():
+            while not work.empty():
+                request = work.get_nowait()
+                started = time.perf_counter()
+                status = await handle(request)
+                results.append((request.scenario, status, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def run_load(mode, total=2000, concurrency=32, workers=8, subjects=20, prefix='seed', host=None, db_latency=0.0, client_delay=0.0, warmup=20):
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    host = host or default_host()
+    requests = build_requests(prefix, subjects)
+    connection.close()  # requests run on their own threads and connections
+    if db_latency:
+        add_db_latency(db_latency)
+    if mode == 'wsgi':
+        run_wsgi(requests, warmup, 1, 1, host, 0)
+        results, elapsed = run_wsgi(requests, total, concurrency, workers, host, client_delay)
+    else:
+        run_asgi(requests, warmup, 1, host, 0)
+        results, elapsed = run_asgi(requests, total, concurrency, host, client_delay)
+
+    statuses = {}
+    by_scenario = {}
+    for scenario, status, latency in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        by_scenario.setdefault(scenario, []).append(latency)
+    latencies = [latency for _, _, latency in results]
+    return {
+        'meta': {
+            'started': timezone.now().isoformat(),
+            'mode': mode,
+            'async_views': getattr(settings, 'ASYNC_VIEWS', False),
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'concurrency': concurrency,
+            'workers': workers if mode == 'wsgi' else None,
+            'db_latency_ms': db_latency * 1000,
+            'client_delay_ms': client_delay * 1000,
+        },
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_second': round(len(results) / elapsed, 1),
+        **percentiles(latencies),
+        'status_codes': statuses,
+        'scenarios': {
+            name: {'requests': len(samples), **percentiles(samples)} for name, samples in sorted(by_scenario.items())
+        },
+    }
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from accounts.archive import archive_transactions
+
+
+class Command(BaseCommand):
+    help = "Move whole months of checkpointed transactions older than the horizon into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help="Months kept in the live table (default TRANSACTION_ARCHIVE_MONTHS).")
+        parser.add_argument('--batch-size', type=int, help="Rows moved per transaction (default TRANSACTION_ARCHIVE_BATCH_SIZE).")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows each month would move.")
+        parser.add_argument('--json', action='store_true', help="Print the result as JSON.")
+
+    def handle(self, *args, **options):
+        result = archive_transactions(months=options['months'], batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['json']:
+            self.stdout.write(json.dumps(result.as_dict(), indent=2))
+            return
+        for month, moved in sorted(result.months.items()):
+            self.stdout.write(f"{month:%Y-%m}: {moved} row(s){' to move' if options['dry_run'] else ' moved'}")
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{result.moved} row(s) archived in {result.batches} batch(es); entries from {result.horizon} on stay live."
+            ))
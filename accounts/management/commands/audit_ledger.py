@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.journal import audit_balances, rebuild_balances, roll_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Compare every account balance with its journal (latest checkpoint + entries since)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roll', action='store_true', help="Roll checkpoints forward first.")
+        parser.add_argument('--fix', action='store_true', help="Reset mismatched balances from the journal.")
+
+    def handle(self, *args, **options):
+        if options['roll']:
+            self.stdout.write(f"{roll_checkpoints()} checkpoint(s) written")
+        mismatched = audit_balances()
+        for account_id, balance, journal_balance in mismatched:
+            self.stdout.write(f"account {account_id}: balance {balance}, journal {journal_balance}")
+        if options['fix'] and mismatched:
+            self.stdout.write(f"{rebuild_balances()} balance(s) rebuilt from the journal")
+        elif not mismatched:
+            self.stdout.write(self.style.SUCCESS("All balances match the journal."))
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.loadtest import MODES, run_load
+
+# ASYNC_VIEWS per mode, as wsgi.py and asgi.py leave it
+ASYNC_VIEWS = {'wsgi': '0', 'asgi': '1'}
+SUMMARY_KEYS = ('requests_per_second', 'p50_ms', 'p99_ms', 'max_ms')
+
+
+class Command(BaseCommand):
+    help = "Load-test the read-heavy pages under WSGI and ASGI and compare requests/sec and p99 (see accounts/loadtest.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help="Run one mode in this process (default: both, each in its own process).")
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32, help="Clients sending requests back to back.")
+        parser.add_argument('--workers', type=int, default=8, help="WSGI worker threads.")
+        parser.add_argument('--subjects', type=int, default=20)
+        parser.add_argument('--prefix', default='seed', help="Username prefix given to `seed`.")
+        parser.add_argument('--db-latency', type=float, default=0.0, help="Milliseconds added to every query.")
+        parser.add_argument('--client-delay', type=float, default=0.0, help="Milliseconds each client takes to read a response.")
+        parser.add_argument('--host', help="Host header (default: first ALLOWED_HOSTS entry).")
+        parser.add_argument('--json', action='store_true', help="Print the report as one JSON object.")
+        parser.add_argument('--output', help="Write the report(s) to this JSON file.")
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            report = self.run_mode(options)
+            reports = {options['mode']: report}
+        else:
+            reports = {mode: self.spawn(mode, options) for mode in MODES}
+            self.stdout.write(f"{'':6}" + ''.join(f"{key:>22}" for key in SUMMARY_KEYS))
+            for mode, report in reports.items():
+                self.stdout.write(f"{mode:6}" + ''.join(f"{report[key]:>22}" for key in SUMMARY_KEYS))
+            wsgi, asgi = reports['wsgi'], reports['asgi']
+            self.stdout.write(
+                f"asgi/wsgi: {asgi['requests_per_second'] / wsgi['requests_per_second']:.2f}x requests/sec, "
+                f"{asgi['p99_ms'] / wsgi['p99_ms']:.2f}x p99"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(reports, handle, indent=2)
+
+    def run_mode(self, options):
+        expected = options['mode'] == 'asgi'
+        if getattr(settings, 'ASYNC_VIEWS', False) != expected:
+            raise CommandError(f"--mode {options['mode']} needs ASYNC_VIEWS={ASYNC_VIEWS[options['mode']]}")
+        try:
+            report = run_load(
+                options['mode'],
+                total=options['requests'],
+                concurrency=options['concurrency'],
+                workers=options['workers'],
+                subjects=options['subjects'],
+                prefix=options['prefix'],
+                host=options['host'],
+                db_latency=options['db_latency'] / 1000,
+                client_delay=options['client_delay'] / 1000,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+        return report
+
+    def spawn(self, mode, options):
+        # The URLconf picks sync or async views at import, so each mode needs its own process
+        arguments = [
+            '--mode', mode, '--json',
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+            '--workers', str(options['workers']),
+            '--subjects', str(options['subjects']),
+            '--prefix', options['prefix'],
+            '--db-latency', str(options['db_latency']),
+            '--client-delay', str(options['client_delay']),
+        ]
+        if options['host']:
+            arguments += ['--host', options['host']]
+        completed = subprocess.run(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'bench_asgi', *arguments],
+            env={**os.environ, 'ASYNC_VIEWS': ASYNC_VIEWS[mode]}, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"bench_asgi --mode {mode} failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# SQLite profiles compared on a fresh database file each (see DATABASES in settings.py)
+PROFILES = {
+    'rollback-journal': {'SQLITE_TUNED': '0'},
+    'wal-tuned': {'SQLITE_TUNED': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent ledger write throughput under the SQLite database profiles (runs bench_ledger per profile)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--accounts', type=int, default=50)
+        parser.add_argument('--operations', type=int, default=200, help="Transfers per thread.")
+        parser.add_argument('--profile', action='append', choices=sorted(PROFILES), help="Repeat to pick several (default: all).")
+        parser.add_argument('--output', help="Write the results to this JSON file.")
+
+    def manage(self, env, *args):
+        completed = subprocess.run(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), *args],
+            env=env, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{' '.join(args)} failed:\n{completed.stderr}")
+        return completed.stdout
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['profile'] or list(PROFILES):
+                env = {
+                    **os.environ,
+                    **PROFILES[name],
+                    'DB_ENGINE': 'sqlite',
+                    'SQLITE_PATH': os.path.join(directory, f'{name}.sqlite3'),
+                    'METRICS_ENABLED': '0',
+                }
+                env.pop('REPLICA_SQLITE_PATH', None)
+                self.manage(env, 'migrate', '--verbosity', '0')
+                # The profile's database is a fresh file of its own, so the benchmark writes into it directly
+                output = self.manage(
+                    env, 'bench_ledger', '--json', '--in-place',
+                    '--threads', str(options['threads']),
+                    '--accounts', str(options['accounts']),
+                    '--operations', str(options['operations']),
+                )
+                results[name] = json.loads(output.strip().splitlines()[-1])
+                result = results[name]
+                self.stdout.write(
+                    f"{name:18} {result['ops_per_second']:9.1f} ops/s  p50 {result['p50_ms']:7.2f}ms  "
+                    f"p99 {result['p99_ms']:8.2f}ms  outcomes {result['outcomes']}"
+                )
+
+        if len(results) > 1:
+            baseline, *others = results.values()
+            for name, result in list(results.items())[1:]:
+                self.stdout.write(f"{name}: {result['ops_per_second'] / baseline['ops_per_second']:.2f}x the writes of {next(iter(results))}")
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
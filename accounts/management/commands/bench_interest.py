@@ -0,0 +1,57 @@
+import random
+import time
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from accounts.interest import accrued_interest
+from accounts.interest_batch import accrued_interest_cents, from_cents
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-account interest cost: vectorized integer cents vs the Decimal path."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=1_000_000)
+        parser.add_argument('--decimal-sample', type=int, default=100_000,
+                            help="Accounts priced through the Decimal path for timing and cross-checking.")
+        parser.add_argument('--rounding', choices=['half_even', 'half_up'], default='half_even')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rounding = ROUND_HALF_EVEN if options['rounding'] == 'half_even' else ROUND_HALF_UP
+        count = options['accounts']
+        rng = random.Random(options['seed'])
+        rates = [500, 525, 350, 725]
+        balances = [rng.randint(1, 10**9) for _ in range(count)]
+        days = [rng.choice([1, 1, 1, 2, 3, 30]) for _ in range(count)]
+        rate_bp = [rng.choice(rates) for _ in range(count)]
+
+        arrays = [np.asarray(values, dtype=np.int64) for values in (balances, days, rate_bp)]
+        started = time.perf_counter()
+        interest = accrued_interest_cents(*arrays, rounding=rounding)
+        vectorized = time.perf_counter() - started
+
+        sample = min(options['decimal_sample'], count)
+        decimal_balances = [from_cents(cents) for cents in balances[:sample]]
+        decimal_rates = [Decimal(bp) / 10000 for bp in rate_bp[:sample]]
+        started = time.perf_counter()
+        expected = [
+            accrued_interest(balance, day_count, rate, rounding)
+            for balance, day_count, rate in zip(decimal_balances, days[:sample], decimal_rates)
+        ]
+        scalar = time.perf_counter() - started
+
+        mismatches = sum(1 for want, got in zip(expected, interest[:sample].tolist()) if want != from_cents(got))
+
+        vectorized_ns = vectorized / count * 1e9
+        scalar_ns = scalar / sample * 1e9 if sample else 0.0
+        self.stdout.write(f"accounts:            {count}")
+        self.stdout.write(f"vectorized total:    {vectorized * 1000:.1f} ms ({vectorized_ns:.1f} ns/account)")
+        self.stdout.write(f"decimal sample:      {sample} accounts, {scalar * 1000:.1f} ms ({scalar_ns:.1f} ns/account)")
+        if vectorized_ns:
+            self.stdout.write(f"speedup:             {scalar_ns / vectorized_ns:.1f}x")
+        self.stdout.write(f"mismatches (sample): {mismatches}")
+        if mismatches:
+            self.stderr.write(self.style.ERROR("Vectorized and Decimal results differ."))
@@ -0,0 +1,137 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from accounts import ledger
+from accounts.models import Account
+
+
+def naive_transfer(source, destination, amount):
+    # The pre-ledger view logic: read, modify in Python, save whole rows.
+    source = Account.objects.get(pk=source.pk)
+    destination = Account.objects.get(pk=destination.pk)
+    if source.balance < amount:
+        raise ledger.InsufficientBalance
+    source.balance -= amount
+    destination.balance += amount
+    source.save()
+    destination.save()
+
+
+class Command(BaseCommand):
+    help = "Multi-threaded contention benchmark for ledger transfers (ledger vs naive read-modify-save)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--accounts', type=int, default=4, help="Fewer accounts means hotter rows.")
+        parser.add_argument('--operations', type=int, default=200, help="Transfers per thread.")
+        parser.add_argument('--initial-balance', type=Decimal, default=Decimal('1000.00'))
+        parser.add_argument('--mode', choices=['ledger', 'naive'], default='ledger')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--in-place', action='store_true',
+            help="Run against the configured database instead of a throwaway one. The benchmark's accounts and journal entries stay there.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print the summary as one JSON object.")
+
+    def handle(self, *args, **options):
+        if options['in_place']:
+            return self.run(options)
+        # Transactions are append-only, so the benchmark writes into a test database that is dropped afterwards
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # A file rather than memory, so the configured journal mode and locking apply
+                connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench_ledger.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        user = User.objects.create(username=f"ledger-bench-{time.time_ns()}")
+        accounts = Account.objects.bulk_create([
+            Account(user=user, account_number=f"9{user.pk:06d}{i:07d}", account_type='current', balance=options['initial_balance'])
+            for i in range(options['accounts'])
+        ])
+        expected_total = options['initial_balance'] * len(accounts)
+        move = ledger.transfer if options['mode'] == 'ledger' else naive_transfer
+
+        outcomes = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local_outcomes = Counter()
+            local_latencies = []
+            try:
+                for _ in range(options['operations']):
+                    source, destination = rng.sample(accounts, 2)
+                    amount = Decimal(rng.randint(1, 5000)) / 100
+                    started = time.perf_counter()
+                    try:
+                        move(source, destination, amount)
+                        local_outcomes['ok'] += 1
+                    except ledger.InsufficientBalance:
+                        local_outcomes['insufficient'] += 1
+                    except OperationalError:
+                        local_outcomes['db_error'] += 1
+                    local_latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                outcomes.update(local_outcomes)
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=worker, args=(options['seed'] + i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        account_ids = [account.pk for account in accounts]
+        final_total = Account.objects.filter(pk__in=account_ids).aggregate(total=Sum('balance'))['total']
+        negative = Account.objects.filter(pk__in=account_ids, balance__lt=0).count()
+        operations = sum(outcomes.values())
+        latencies.sort()
+
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'mode': options['mode'],
+                'vendor': connection.vendor,
+                'threads': options['threads'],
+                'accounts': len(accounts),
+                'operations': operations,
+                'elapsed': round(elapsed, 3),
+                'ops_per_second': round(operations / elapsed, 1),
+                'outcomes': dict(outcomes),
+                'p50_ms': round(p50 * 1000, 2),
+                'p99_ms': round(p99 * 1000, 2),
+                'money_conserved': final_total == expected_total,
+                'negative_balances': negative,
+            }))
+        else:
+            self.stdout.write(f"mode:              {options['mode']} on {connection.vendor}")
+            self.stdout.write(f"threads/accounts:  {options['threads']}/{len(accounts)}")
+            self.stdout.write(f"operations:        {operations} in {elapsed:.2f}s ({operations / elapsed:.1f} ops/s)")
+            self.stdout.write(f"outcomes:          {dict(outcomes)}")
+            if latencies:
+                self.stdout.write(f"latency ms:        p50={p50 * 1000:.2f} p99={p99 * 1000:.2f}")
+            self.stdout.write(f"money conserved:   {final_total == expected_total} ({final_total} vs {expected_total})")
+            self.stdout.write(f"negative balances: {negative}")
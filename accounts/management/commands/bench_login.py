@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from accounts.benchmark import run_login_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure the CPU time of a successful, a failed and a throttled login (creates and removes a temporary user)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=5, help="Attempts per outcome; the median is reported.")
+        parser.add_argument('--host', help="Host header (default: first ALLOWED_HOSTS entry).")
+        parser.add_argument('--json', action='store_true', help="Print the report as one JSON object.")
+
+    def handle(self, *args, **options):
+        report = run_login_benchmark(options['attempts'], options['host'])
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(f"one password check: {report['password_check_ms']:.1f}ms CPU")
+        for outcome in ('success', 'failure', 'shed'):
+            self.stdout.write(
+                f"{outcome:8} {report[f'{outcome}_ms']:9.1f}ms CPU  = {report[f'{outcome}_checks']:.2f} password checks"
+            )
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.benchmark import SCENARIOS, compare, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Drive the main views and the interest task over a seeded database; write latency percentiles and query counts as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help="Repeat to pick several (default: all).")
+        parser.add_argument('--iterations', type=int, default=100, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--subjects', type=int, default=20, help="Seeded users the requests rotate through.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix given to `seed`.")
+        parser.add_argument('--no-interest', action='store_true', help="Skip the interest task run.")
+        parser.add_argument('--host', help="Host header (default: the first entry of ALLOWED_HOSTS, else localhost).")
+        parser.add_argument('--output', help="Write the report to this JSON file.")
+        parser.add_argument('--compare', help="Earlier report to compare against.")
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmark(
+                scenarios=options['scenario'],
+                iterations=options['iterations'],
+                subjects=options['subjects'],
+                prefix=options['prefix'],
+                warmup=options['warmup'],
+                interest=not options['no_interest'],
+                host=options['host'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name, result in report['scenarios'].items():
+            if 'p50_ms' in result:
+                self.stdout.write(
+                    f"{name:20} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms  "
+                    f"queries {result['queries_mean']:6.1f}  {result['status_codes']}"
+                )
+            else:
+                self.stdout.write(f"{name:20} {result['elapsed_ms']:8.2f}ms  queries {result['queries']}  credited {result['credited']}")
+
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+            self.stdout.write("\nchange against " + options['compare'])
+            for name, key, previous, current, change in compare(report, baseline):
+                self.stdout.write(f"{name:20} {key:14} {previous:>10} -> {current:>10}  ({change:+.1f}%)")
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"wrote {options['output']}")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from accounts import statements
+from accounts.models import Account
+
+
+def date_argument(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Stream an account statement as CSV or NDJSON in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_number')
+        parser.add_argument('--from', dest='start_date', type=date_argument, help="First day (YYYY-MM-DD), inclusive.")
+        parser.add_argument('--to', dest='end_date', type=date_argument, help="Last day (YYYY-MM-DD), inclusive.")
+        parser.add_argument('--format', choices=sorted(statements.FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write; defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=statements.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            account = Account.objects.get(account_number=options['account_number'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Account {options['account_number']} does not exist")
+
+        rows = statements.statement_rows(account, options['start_date'], options['end_date'], options['chunk_size'])
+        lines = statements.encode(rows, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
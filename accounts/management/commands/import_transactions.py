@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from accounts.importer import DEFAULT_CHUNK_SIZE, import_file
+
+
+class Command(BaseCommand):
+    help = "Post a branch batch file of deposits and withdrawals (CSV or NDJSON)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV with account_number,transaction_type,amount,description columns, or NDJSON with the same keys.")
+        parser.add_argument('--rejects', help="Write rejected rows and the reason to this CSV file.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        result = import_file(options['path'], options['rejects'], options['chunk_size'])
+        self.stdout.write(
+            f"{result.imported} imported, {result.rejected} rejected of {result.rows} rows "
+            f"in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        )
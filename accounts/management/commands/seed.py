@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from accounts.seeding import seed
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, accounts, transactions and loans for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--accounts', type=int, help="Total customer accounts (default 1.5 per user).")
+        parser.add_argument('--transactions', type=int, default=100000, help="Generated events; transfers and payments write two entries.")
+        parser.add_argument('--loans', type=int, help="Default one per four users.")
+        parser.add_argument('--merchants', type=int, default=5, help="Hot accounts that receive the payment traffic.")
+        parser.add_argument('--days', type=int, default=365, help="Spread the history over this many days.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must be unused.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        result = seed(
+            users=options['users'],
+            accounts=options['accounts'],
+            transactions=options['transactions'],
+            loans=options['loans'],
+            merchants=options['merchants'],
+            days=options['days'],
+            prefix=options['prefix'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(json.dumps(result.as_dict(), indent=2))
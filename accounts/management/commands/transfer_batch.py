@@ -0,0 +1,91 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import ledger
+from accounts.models import Account
+
+
+def parse_amount(value):
+    """Return (amount, error). Amounts are never rounded: more than two decimal places is an error."""
+    try:
+        amount = Decimal(str(value).strip()) if value not in (None, '') else None
+    except InvalidOperation:
+        amount = None
+    if amount is None or not amount.is_finite():
+        return None, "Invalid amount."
+    if -amount.as_tuple().exponent > 2:
+        return amount, "Amount has more than two decimal places."
+    return amount, ''
+
+
+def read_items(path):
+    """Yield (to_account_number, amount, error) from a CSV (to_account,amount) or NDJSON file.
+
+    ``error`` is empty for items that can be settled.
+    """
+    with open(path, newline='') as handle:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield '', None, f"Line {number} is not valid JSON: {e.msg}"
+                    continue
+                if not isinstance(row, dict):
+                    yield '', None, f"Line {number} is not a JSON object"
+                    continue
+                yield (str(row.get('to_account', '')).strip(), *parse_amount(row.get('amount')))
+        else:
+            for row in csv.DictReader(handle):
+                yield ((row.get('to_account') or '').strip(), *parse_amount(row.get('amount')))
+
+
+def settle(source, items):
+    """Settle the valid items in one batch; return one TransferResult per item, in file order."""
+    items = list(items)
+    valid = [index for index, (_, _, error) in enumerate(items) if not error]
+    results = [
+        ledger.TransferResult(index, number, amount, False, error)
+        for index, (number, amount, error) in enumerate(items) if error
+    ]
+    for index, result in zip(valid, ledger.transfer_batch(source, [items[index][:2] for index in valid])):
+        result.index = index
+        results.append(result)
+    return sorted(results, key=lambda result: result.index)
+
+
+class Command(BaseCommand):
+    help = "Settle a file of transfers out of one account in a single database transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Account number to pay from.")
+        parser.add_argument('path', help="CSV with to_account,amount columns, or NDJSON with the same keys.")
+        parser.add_argument('--report', help="Write per-item results to this CSV file.")
+
+    def handle(self, *args, **options):
+        try:
+            source = Account.objects.get(account_number=options['source'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Account {options['source']} does not exist")
+
+        results = settle(source, read_items(options['path']))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['index', 'to_account', 'amount', 'status', 'error'])
+                for result in results:
+                    writer.writerow([result.index, result.to_account, result.amount, 'ok' if result.ok else 'failed', result.error])
+        else:
+            for result in results:
+                if not result.ok:
+                    self.stderr.write(f"#{result.index} {result.to_account} {result.amount}: {result.error}")
+
+        settled = [result for result in results if result.ok]
+        total = sum((result.amount for result in settled), Decimal('0.00'))
+        self.stdout.write(f"{len(settled)}/{len(results)} transfers settled, {total} debited from {source.account_number}")
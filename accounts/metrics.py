@@ -0,0 +1,288 @@
+"""In-process metrics with Prometheus text exposition.
+
+Each metric keeps one shard per thread that records into it. Recording
+takes that shard's own lock, which is uncontended because only its thread
+writes to it. Only a scrape takes the shard locks while it copies and merges
+them. WSGI/ASGI worker threads therefore never wait on each other to record.
+When a thread exits, its shard is folded into the metric's retired totals,
+so servers that start a thread per request do not grow the shard list.
+
+Counts are per process. With several worker processes, scrape each one or
+put an aggregating exporter in front.
+"""
+import bisect
+import functools
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .queries import arecord_request_queries, record_request_queries
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+class ThreadOwner:
+    """Held only by a thread's locals, so it is collected when the thread exits."""
+
+    __slots__ = ('__weakref__',)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+        self._retired = self.new_shard()
+        self._exited = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = (threading.Lock(), self.new_shard())
+            # Dropped with the thread's locals when the thread exits
+            self._local.owner = owner = ThreadOwner()
+            with self._shards_lock:
+                self._retire_exited()
+                self._shards[id(shard)] = shard
+            # Only a list append, which is safe wherever the finalizer runs
+            weakref.finalize(owner, self._exited.append, id(shard))
+        return shard
+
+    def _retire_exited(self):
+        """Fold the shards of exited threads into the retired totals; call with _shards_lock held."""
+        while self._exited:
+            lock, values = self._shards.pop(self._exited.pop())
+            with lock:
+                items = list(values.items())
+            for labels, value in items:
+                self.merge(self._retired, labels, value)
+
+    def new_shard(self):
+        return defaultdict(float)
+
+    def collect(self):
+        """Snapshot of {labels: value} merged over all threads."""
+        merged = self.new_shard()
+        with self._shards_lock:
+            self._retire_exited()
+            shards = list(self._shards.values())
+            for labels, value in self._retired.items():
+                self.merge(merged, labels, value)
+        for lock, values in shards:
+            with lock:
+                items = list(values.items())
+            for labels, value in items:
+                self.merge(merged, labels, value)
+        return merged
+
+    def merge(self, merged, labels, value):
+        merged[labels] += value
+
+    def label_text(self, labels, extra=()):
+        pairs = list(zip(self.labelnames, labels)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.collect().items()):
+            lines.extend(self.samples(labels, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        lock, values = self._shard()
+        with lock:
+            values[labels] += amount
+
+    def samples(self, labels, value):
+        return [f"{self.name}{self.label_text(labels)} {format_value(value)}"]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def new_shard(self):
+        # Per label set: a count per bucket (+Inf last), then sum, then count
+        return defaultdict(lambda: [0] * (len(self.buckets) + 1) + [0.0, 0])
+
+    def observe(self, *labels, value):
+        lock, values = self._shard()
+        index = bisect.bisect_left(self.buckets, value)
+        with lock:
+            row = values[labels]
+            row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def merge(self, merged, labels, value):
+        row = merged[labels]
+        for i, amount in enumerate(value):
+            row[i] += amount
+
+    def samples(self, labels, row):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), row):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else format_value(bound)
+            lines.append(f"{self.name}_bucket{self.label_text(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self.label_text(labels)} {format_value(row[-2])}")
+        lines.append(f"{self.name}_count{self.label_text(labels)} {row[-1]}")
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.exposition())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    'bank_http_request_duration_seconds', "Time to produce a response, by URL name.", ('view', 'method'),
+))
+requests_total = registry.register(Counter(
+    'bank_http_requests_total', "Responses by URL name and status code.", ('view', 'method', 'status'),
+))
+request_queries = registry.register(Histogram(
+    'bank_db_queries_per_request', "SQL queries run per request, by URL name.", ('view',),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+))
+request_db_duration = registry.register(Histogram(
+    'bank_db_duration_seconds', "Time spent in SQL per request, by URL name.", ('view',),
+))
+money_movements = registry.register(Counter(
+    'bank_money_movements_total', "Ledger operations by outcome.", ('operation', 'outcome'),
+))
+login_attempts = registry.register(Counter(
+    'bank_login_attempts_total', "Login attempts by outcome; shed_* were turned away before password hashing.", ('outcome',),
+))
+login_cpu = registry.register(Histogram(
+    'bank_login_cpu_seconds', "CPU time of the worker thread per login attempt, by outcome.", ('outcome',),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+))
+task_duration = registry.register(Histogram(
+    'bank_celery_task_duration_seconds', "Celery task run time, by task name and final state.", ('task', 'state'),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+))
+
+
+def track_movement(operation):
+    """Count the outcome of a ledger operation in bank_money_movements_total."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            from .ledger import InsufficientBalance, LedgerError  # ledger imports this module
+            try:
+                result = func(*args, **kwargs)
+            except InsufficientBalance:
+                money_movements.inc(operation, 'insufficient_balance')
+                raise
+            except LedgerError:
+                money_movements.inc(operation, 'rejected')
+                raise
+            except Exception:
+                money_movements.inc(operation, 'error')
+                raise
+            money_movements.inc(operation, 'ok')
+            return result
+        return wrapper
+    return decorate
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with record_request_queries(request) as recorder:
+            response = self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        async with arecord_request_queries(request) as recorder:
+            response = await self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, recorder, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        request_duration.observe(view, request.method, value=elapsed)
+        requests_total.inc(view, request.method, str(response.status_code))
+        request_queries.observe(view, value=recorder.count)
+        request_db_duration.observe(view, value=recorder.duration)
+
+
+_task_starts = {}
+
+
+def task_started(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _task_starts.pop(task_id, None)
+    if started is not None:
+        task_duration.observe(task.name, state or 'UNKNOWN', value=time.perf_counter() - started)
+
+
+def connect_task_metrics():
+    if not enabled():
+        return
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(task_started, weak=False, dispatch_uid='accounts.metrics.task_started')
+    task_postrun.connect(task_finished, weak=False, dispatch_uid='accounts.metrics.task_finished')
@@ -0,0 +1,69 @@
+"""Query instrumentation middleware (see queries.py).
+
+``QUERY_INSTRUMENTATION`` turns it on. Set it to ``headers`` to add
+X-DB-Queries, X-DB-Time-Ms, X-DB-Duplicate-Queries and X-DB-Query-Budget to
+responses, to ``log`` to write one line per request to the ``accounts.queries``
+logger, or to ``headers,log`` for both. When it is empty the middleware takes
+itself out of the stack.
+
+It runs natively under both WSGI and ASGI, so the async views do not pay a
+thread hop for it.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .queries import arecord_request_queries, budget_for, record_request_queries
+
+logger = logging.getLogger('accounts.queries')
+
+
+class QueryCountMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        modes = {mode.strip() for mode in getattr(settings, 'QUERY_INSTRUMENTATION', '').split(',') if mode.strip()}
+        if not modes:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.headers = 'headers' in modes
+        self.log = 'log' in modes
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Queries run while a streaming response is consumed happen after this returns and are not counted
+        with record_request_queries(request) as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        async with arecord_request_queries(request) as recorder:
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        match = request.resolver_match
+        budget = budget_for(match.func) if match else None
+        if self.headers:
+            response['X-DB-Queries'] = str(recorder.count)
+            response['X-DB-Time-Ms'] = f"{recorder.duration * 1000:.2f}"
+            response['X-DB-Duplicate-Queries'] = str(recorder.duplicate_count)
+            if budget is not None:
+                response['X-DB-Query-Budget'] = str(budget)
+        if self.log:
+            over_budget = budget is not None and recorder.count > budget
+            level = logging.WARNING if over_budget or recorder.duplicates else logging.INFO
+            logger.log(
+                level, "%s %s: %d queries in %.2fms, budget %s, %d duplicates",
+                request.method, match.view_name if match else request.path,
+                recorder.count, recorder.duration * 1000, budget, recorder.duplicate_count,
+            )
+            for sql, count in recorder.duplicates[:5]:
+                logger.log(level, "  %dx %s", count, sql)
+        return response
@@ -0,0 +1,51 @@
+import re
+
+from django.db import migrations
+
+REPAYMENT_DESCRIPTION = re.compile(r'^Repayment for Loan #(\d+)$')
+BATCH_SIZE = 2000
+
+
+def backfill_transaction_loan(apps, schema_editor):
+    Transaction = apps.get_model('accounts', 'Transaction')
+    Loan = apps.get_model('accounts', 'Loan')
+
+    repayments = (
+        Transaction.objects
+        .filter(transaction_type='repayment', loan__isnull=True, description__startswith='Repayment for Loan #')
+        .only('id', 'account_id', 'description')
+        .order_by('id')
+    )
+    last_id = 0
+    while True:
+        batch = list(repayments.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        loan_ids = {}
+        for txn in batch:
+            match = REPAYMENT_DESCRIPTION.match(txn.description.strip())
+            if match:
+                loan_ids[txn.id] = int(match.group(1))
+        loan_accounts = dict(Loan.objects.filter(id__in=set(loan_ids.values())).values_list('id', 'account_id'))
+
+        updated = []
+        for txn in batch:
+            loan_id = loan_ids.get(txn.id)
+            # loan_details only ever matched repayments made from the loan's own account
+            if loan_id in loan_accounts and loan_accounts[loan_id] == txn.account_id:
+                txn.loan_id = loan_id
+                updated.append(txn)
+        Transaction.objects.bulk_update(updated, ['loan'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_transaction_loan_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_transaction_loan, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Max
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+
+
+def create_opening_checkpoints(apps, schema_editor):
+    # Earlier rows carry no signed amount, so the journal starts from the
+    # balances as they stand now: one checkpoint per account at the current
+    # highest transaction id.
+    Account = apps.get_model('accounts', 'Account')
+    Transaction = apps.get_model('accounts', 'Transaction')
+    BalanceCheckpoint = apps.get_model('accounts', 'BalanceCheckpoint')
+
+    entry_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+    as_of = timezone.now()
+    last_pk = 0
+    while True:
+        batch = list(Account.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'balance')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        BalanceCheckpoint.objects.bulk_create([
+            BalanceCheckpoint(account_id=account_id, entry_id=entry_id, as_of=as_of, balance=balance, is_opening=True)
+            for account_id, balance in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_balance_journal'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_checkpoints, migrations.RunPython.noop),
+    ]
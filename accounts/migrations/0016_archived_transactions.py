@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('transfer', 'Transfer'), ('interest', 'Interest'), ('repayment', 'Repayment'), ('disbursement', 'Disbursement')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('timestamp', models.DateTimeField()),
+                ('description', models.CharField(blank=True, max_length=255, null=True)),
+                ('signed_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('archive_month', models.DateField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='accounts.account')),
+                ('loan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_transactions', to='accounts.loan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'timestamp'], name='archive_account_ts_idx'), models.Index(fields=['archive_month'], name='archive_month_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_EVEN
+from .interest import CENT, accrued_interest, interest_days
 
 class Account(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -13,16 +15,19 @@ class Account(models.Model):
     last_interest_calculation = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=[('active', 'Active'), ('closed', 'Closed')], default='active')
 
-    def calculate_interest(self):
+    class Meta:
+        indexes = [
+            # admin date hierarchy
+            models.Index(fields=['created_at'], name='account_created_idx'),
+        ]
+
+    def calculate_interest(self, now=None):
         if self.account_type == 'savings' and self.balance > 0:
-            now = timezone.now()
-            if self.last_interest_calculation:
-                days_since_last_calculation = (now - self.last_interest_calculation).days
-            else:
-                days_since_last_calculation = (now - self.created_at).days
-            interest_rate = Decimal('0.05')  # 5% annual interest rate
-            daily_interest = (self.balance * interest_rate) / Decimal('365')
-            total_interest = daily*interest * Decimal(str(days_since_last_calculation))
+            now = now or timezone.now()
+            days_since_last_calculation = interest_days(self.created_at, self.last_interest_calculation, now)
+            if days_since_last_calculation < 1:
+                return  # keep the partial day so it is credited on the next run
+            total_interest = accrued_interest(self.balance, days_since_last_calculation)
             
             #update balance and last interest calculation rate
             self.balance += total_interest
@@ -34,49 +39,251 @@ class Account(models.Model):
                 account=self,
                 transaction_type='interest',
                 amount=total_interest,
+                signed_amount=total_interest,
                 description=f"Interest added for {days_since_last_calculation} days"
             )
     
     def __str__(self):
         return f"{self.account_number} - {self.user.username}"
 
+class TransactionManager(models.Manager):
+    def with_archive(self):
+        """Live and archived entries read together with one UNION (see accounts/archive.py)."""
+        from .archive import History
+        return History(self.get_queryset(), ArchivedTransaction.objects.all())
+
+
 class Transaction(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
-    transaction_type = models.CharField(max_length=20, choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('transfer', 'Transfer'), ('interest', 'Interest')])
+    transaction_type = models.CharField(max_length=20, choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal'), ('transfer', 'Transfer'), ('interest', 'Interest'), ('repayment', 'Repayment'), ('disbursement', 'Disbursement')])
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     timestamp = models.DateTimeField(auto_now_add=True)
     description = models.CharField(max_length=255, blank=True, null=True)
+    loan = models.ForeignKey('Loan', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+    # Effect on the account balance (+ credit, - debit); null only for rows older than the journal
+    signed_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    objects = TransactionManager()
+
+    class Meta:
+        indexes = [
+            # history pages: WHERE account_id = ? ORDER BY timestamp DESC
+            models.Index(fields=['account', 'timestamp'], name='txn_account_ts_idx'),
+            # typed history (repayments, interest) for one account
+            models.Index(fields=['account', 'transaction_type', 'timestamp'], name='txn_account_type_ts_idx'),
+            # journal replay: entries for one account after a checkpoint
+            models.Index(fields=['account', 'id'], name='txn_account_id_idx'),
+            # admin date hierarchy: MIN/MAX and day ranges over all accounts
+            models.Index(fields=['timestamp'], name='txn_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.transaction_type} - {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and getattr(settings, 'LEDGER_APPEND_ONLY', True):
+            raise ValueError("Transactions are append-only and cannot be changed once recorded.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if getattr(settings, 'LEDGER_APPEND_ONLY', True):
+            raise ValueError("Transactions are append-only and cannot be deleted.")
+        return super().delete(*args, **kwargs)
     
+class ArchivedTransaction(models.Model):
+    # Transaction rows moved out of the live table by accounts/archive.py. The
+    # columns match Transaction's, in the same order, so both tables can be
+    # read with one UNION; ids are kept from the live table.
+    id = models.BigIntegerField(primary_key=True)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='archived_transactions')
+    transaction_type = models.CharField(max_length=20, choices=Transaction._meta.get_field('transaction_type').choices)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    timestamp = models.DateTimeField()
+    description = models.CharField(max_length=255, blank=True, null=True)
+    loan = models.ForeignKey('Loan', on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_transactions')
+    signed_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # First day of the month the entry was recorded in
+    archive_month = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'timestamp'], name='archive_account_ts_idx'),
+            models.Index(fields=['archive_month'], name='archive_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} - {self.amount} (archived)"
+
+
 class Loan(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='loans', default=1)  # Set default to the first account
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
-    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending')
+    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('repaid', 'Repaid')], default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     return_date = models.DateField(null=True, blank=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     duration_months = models.IntegerField(help_text="Duration in months (e.g., 12, 18, 24)", default=12)
 
+    # Fields whose loaded values are remembered so save() can see transitions
+    tracked_fields = ('status',)
+
+    class Meta:
+        indexes = [
+            # admin date hierarchy
+            models.Index(fields=['created_at'], name='loan_created_idx'),
+        ]
+
     def __str__(self):
         return f"Loan #{self.id} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Only the fields actually reloaded; the others keep the value last read or written
+        reloaded = self.tracked_fields if fields is None else set(fields) & set(self.tracked_fields)
+        deferred = self.get_deferred_fields()
+        self._remember_loaded((name, getattr(self, name)) for name in reloaded if name not in deferred)
+
+    def _remember_loaded(self, pairs):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name, value in pairs:
+            if name in self.tracked_fields and value is not models.DEFERRED:
+                loaded[name] = value
+
+    def loaded_value(self, name):
+        """Value of a tracked field as last read from or written to the database."""
+        loaded = self.__dict__.get('_loaded_values', {})
+        if name not in loaded and self.pk is not None and not self._state.adding:
+            # Built by hand or loaded with the field deferred: ask the database once.
+            loaded[name] = Loan.objects.filter(pk=self.pk).values_list(name, flat=True).first()
+            self._loaded_values = loaded
+        return loaded.get(name)
+
+    def transitioned(self, previous_status):
+        """Run the ``on_<status>`` hook for a change away from ``previous_status``.
+
+        Hooks run inside the transaction that records the new status; fields
+        they set on the loan are saved along with it when called from save().
+        """
+        if previous_status != self.status:
+            hook = getattr(self, f'on_{self.status}', None)
+            if hook is not None:
+                hook()
+        self._remember_loaded([('status', self.status)])
+
+    def on_approved(self):
+        # Credit the loan's account and fix the repayment terms
+        from .ledger import disburse_loan
+        self.set_approval_terms()
+        disburse_loan(self)
+
+    def on_repaid(self):
+        pass
+
     def save(self, *args, **kwargs):
-        # Update balance, calculate total amount, and set return date when loan is approved
-        if self.status == 'approved' and self.pk is not None:
-            original_loan = Loan.objects.get(pk=self.pk)
-            if original_loan.status != 'approved':  # Check if status changed to approved
-                # Update account balance
-                self.account.balance += self.amount
-                self.account.save()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = update_fields = frozenset(kwargs['update_fields'])
+            if 'status' not in update_fields:
+                # The status is not written, so nothing transitions and the loaded value still stands
+                return super().save(*args, **kwargs)
+
+        # Only existing loans transition; a new loan just starts in its status
+        previous_status = self.status
+        if self.pk is not None and not self._state.adding:
+            previous_status = self.loaded_value('status')
+
+        if previous_status == self.status:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get('using')):
+                self.transitioned(previous_status)
+                super().save(*args, **kwargs)
+        self._remember_loaded([('status', self.status)])
+
+    def set_approval_terms(self):
+        # Calculate total amount (principal + interest)
+        self.total_amount = (self.amount + (self.amount * self.interest_rate / 100)).quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+        # Calculate return date based on duration_months
+        self.return_date = timezone.localdate(self.created_at + timedelta(days=30 * self.duration_months))
+
+class InterestRun(models.Model):
+    run_date = models.DateField(unique=True)
+    as_of = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=[('running', 'Running'), ('done', 'Done')], default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Interest run {self.run_date} ({self.status})"
+
+    def progress(self):
+        totals = self.shards.aggregate(
+            shards=models.Count('id'),
+            shards_done=models.Count('id', filter=models.Q(status='done')),
+            accounts=models.Sum('accounts'),
+            credited=models.Sum('credited'),
+            interest_total=models.Sum('interest_total'),
+        )
+        totals['accounts'] = totals['accounts'] or 0
+        totals['credited'] = totals['credited'] or 0
+        # Quantized: SQLite sums decimals as floats
+        totals['interest_total'] = str((totals['interest_total'] or Decimal('0.00')).quantize(CENT))
+        totals['status'] = self.status
+        return totals
+
 
-                # Calculate total amount (principal + interest)
-                self.total_amount = self.amount + (self.amount * self.interest_rate / 100)
+class InterestShard(models.Model):
+    run = models.ForeignKey(InterestRun, on_delete=models.CASCADE, related_name='shards')
+    first_pk = models.BigIntegerField()
+    last_pk = models.BigIntegerField()
+    checkpoint_pk = models.BigIntegerField(null=True, blank=True)  # last account id fully credited
+    status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done')], default='pending')
+    accounts = models.IntegerField(default=0)
+    credited = models.IntegerField(default=0)
+    interest_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
 
-                # Calculate return date based on duration_months
-                self.return_date = self.created_at + timedelta(days=30 * self.duration_months)
+    class Meta:
+        ordering = ['first_pk']
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+    def __str__(self):
+        return f"Shard {self.first_pk}-{self.last_pk} ({self.status})"
+
+
+class AccountNumberCounter(models.Model):
+    # One row per number series; processes reserve blocks by bumping next_value
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class BalanceCheckpoint(models.Model):
+    # Account balance after every journal entry with id <= entry_id
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='checkpoints')
+    entry_id = models.BigIntegerField()
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    # Taken from the balance column when the journal started; nothing before it can be replayed
+    is_opening = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'entry_id'], name='checkpoint_account_entry_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['account', 'as_of'], name='checkpoint_account_as_of_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} @ {self.entry_id}: {self.balance}"
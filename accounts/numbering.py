@@ -0,0 +1,107 @@
+"""Account number allocation.
+
+Numbers are 14 digits: a 13-digit serial followed by a Luhn check digit.
+Each process reserves a block of serials from its ``AccountNumberCounter``
+row with one UPDATE and then hands them out from memory, so opening an
+account needs no COUNT and concurrent signups never race for the same
+number. Serials left in a block when a process exits are simply skipped.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import AccountNumberCounter
+
+SERIAL_DIGITS = 13
+DEFAULT_BLOCK_SIZE = 100
+DEFAULT_START = 10 ** 12
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def format_account_number(serial):
+    digits = str(serial).zfill(SERIAL_DIGITS)
+    if len(digits) > SERIAL_DIGITS:
+        raise ValueError(f"account number serial {serial} does not fit in {SERIAL_DIGITS} digits")
+    return digits + luhn_check_digit(digits)
+
+
+def is_valid_account_number(number):
+    return len(number) == SERIAL_DIGITS + 1 and number.isdigit() and luhn_check_digit(number[:-1]) == number[-1]
+
+
+class AccountNumberAllocator:
+    def __init__(self, series='account', block_size=None, start=None):
+        self.series = series
+        self._block_size = block_size
+        self._start = start
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = self._end = 0
+
+    @property
+    def block_size(self):
+        return self._block_size or getattr(settings, 'ACCOUNT_NUMBER_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+
+    @property
+    def start(self):
+        return self._start or getattr(settings, 'ACCOUNT_NUMBER_START', DEFAULT_START)
+
+    def reserve_block(self):
+        """Take the next ``block_size`` serials from the counter row; returns (first, end)."""
+        block_size = self.block_size
+        with transaction.atomic():
+            counter = AccountNumberCounter.objects.filter(name=self.series)
+            if not counter.update(next_value=F('next_value') + block_size):
+                AccountNumberCounter.objects.get_or_create(name=self.series, defaults={'next_value': self.start})
+                counter.update(next_value=F('next_value') + block_size)
+            end = counter.values_list('next_value', flat=True).get()
+        return end - block_size, end
+
+    def next_serial(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked worker must not hand out its parent's block
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._next, self._end = self.reserve_block()
+            serial = self._next
+            self._next += 1
+        return serial
+
+    def allocate(self):
+        return format_account_number(self.next_serial())
+
+
+allocator = AccountNumberAllocator()
+
+
+def save_with_account_number(account, attempts=5):
+    """Give ``account`` a freshly allocated number and save it.
+
+    A collision can only come from a number typed in by hand before the
+    allocator existed, so the next serial is simply tried.
+    """
+    for attempt in range(attempts):
+        account.account_number = allocator.allocate()
+        try:
+            with transaction.atomic():
+                account.save()
+            return account
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
@@ -0,0 +1,147 @@
+"""Keyset (cursor) pagination for transaction lists.
+
+Pages are ordered newest first on (timestamp, id) and addressed by an opaque
+cursor naming the row at the page boundary, so every page is an index range
+scan of ``page_size + 1`` rows no matter how deep the reader goes.
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Largest id a BigAutoField holds; a bigger one overflows the database driver
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(timestamp, pk):
+    raw = f"{timestamp.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, pk) or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        timestamp, pk = datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not 0 < pk <= MAX_PK:
+        return None
+    return timestamp, pk
+
+
+def page_size_from(value):
+    default = getattr(settings, 'TRANSACTION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'TRANSACTION_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    def __init__(self, items, page_size, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _window(queryset, after, before, page_size):
+    """The rows to fetch for a page: (queryset slice, whether it walks towards newer rows)."""
+    if before is not None:
+        timestamp, pk = before
+        return (
+            queryset
+            .filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk))
+            .order_by('timestamp', 'pk')[:page_size + 1]
+        ), True
+    if after is not None:
+        timestamp, pk = after
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+    return queryset.order_by('-timestamp', '-pk')[:page_size + 1], False
+
+
+def _page(rows, page_size, newer, after):
+    if newer:
+        has_newer = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_older = True
+    else:
+        has_older = len(rows) > page_size
+        rows = rows[:page_size]
+        has_newer = after is not None
+
+    if not rows:
+        return KeysetPage(rows, page_size)
+    return KeysetPage(
+        rows,
+        page_size,
+        next_cursor=encode_cursor(rows[-1].timestamp, rows[-1].pk) if has_older else None,
+        previous_cursor=encode_cursor(rows[0].timestamp, rows[0].pk) if has_newer else None,
+    )
+
+
+def paginate(queryset, after=None, before=None, page_size=None):
+    """Return one newest-first KeysetPage of ``queryset``.
+
+    ``after`` moves to older rows than its cursor, ``before`` to newer ones;
+    with neither, the newest page is returned.
+    """
+    page_size = page_size or page_size_from(None)
+    after, before = decode_cursor(after), decode_cursor(before)
+    window, newer = _window(queryset, after, before, page_size)
+    rows = list(window)
+    if newer and not rows:
+        return paginate(queryset, page_size=page_size)
+    return _page(rows, page_size, newer, after)
+
+
+async def apaginate(queryset, after=None, before=None, page_size=None):
+    """paginate() for async views, on the async ORM."""
+    page_size = page_size or page_size_from(None)
+    after, before = decode_cursor(after), decode_cursor(before)
+    window, newer = _window(queryset, after, before, page_size)
+    rows = [row async for row in window]
+    if newer and not rows:
+        return await apaginate(queryset, page_size=page_size)
+    return _page(rows, page_size, newer, after)
+
+
+def paginate_request(request, queryset):
+    return paginate(
+        queryset,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=page_size_from(request.GET.get('page_size')),
+    )
+
+
+async def apaginate_request(request, queryset):
+    return await apaginate(
+        queryset,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=page_size_from(request.GET.get('page_size')),
+    )
@@ -0,0 +1,207 @@
+"""Opt-in profiling of sampled requests and Celery task runs.
+
+Nothing is installed unless it is configured. ``ProfilingMiddleware`` takes
+itself out of the stack, and the Celery signal handlers are never connected.
+The per-request cost when idle is therefore zero.
+
+A request is profiled in two cases:
+
+* when it falls in the ``PROFILING_SAMPLE_RATE`` fraction, or
+* when it carries ``X-Profile: <PROFILING_TOKEN>``. Those responses name the
+  file they produced in ``X-Profile-File``.
+
+A task run is profiled when its name is listed in ``PROFILING_TASKS`` and it
+falls in ``PROFILING_TASK_SAMPLE_RATE``. The nightly interest work runs in
+``accounts.tasks.calculate_interest_shard``.
+
+``PROFILING_MODE`` picks how a run is recorded:
+
+* ``cprofile`` writes a ``.prof`` file for pstats, snakeviz or flameprof.
+* ``sampler`` samples the thread's stack every ``PROFILING_INTERVAL`` seconds.
+  It writes collapsed stacks to a ``.folded`` file, which flamegraph.pl and
+  speedscope read. Its overhead does not grow with the number of calls.
+
+Only the newest ``PROFILING_MAX_FILES`` files in ``PROFILING_DIR`` are kept.
+
+The middleware is async-capable, so under ASGI it adds no sync/async
+adapters. An async request's profile covers the event loop thread only.
+Coroutines of other requests in flight show up in it, and queries run in
+the ORM's worker threads do not. Profile the same page under WSGI to see
+those.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+SUFFIXES = {'cprofile': '.prof', 'sampler': '.folded'}
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+_sequence = itertools.count()
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profile_dir():
+    return Path(setting('PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def sampled(rate):
+    return rate > 0 and random.random() < rate
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or setting('PROFILING_INTERVAL', 0.005)
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump_stats(self, path):
+        with open(path, 'w') as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+def start_profiler():
+    """Start a profiler for the current thread; None if one cannot be started."""
+    mode = setting('PROFILING_MODE', 'cprofile')
+    profiler = StackSampler() if mode == 'sampler' else cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one cProfile at a time per process
+        return None
+    return profiler
+
+
+def save_profile(profiler, label, elapsed):
+    """Write the profile under PROFILING_DIR, prune old files and return the file name."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = SUFFIXES['sampler' if isinstance(profiler, StackSampler) else 'cprofile']
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{_UNSAFE.sub('_', label)[:80]}-{elapsed * 1000:.0f}ms-{os.getpid()}-{next(_sequence)}{suffix}"
+    profiler.dump_stats(directory / name)
+    prune(directory, setting('PROFILING_MAX_FILES', 100))
+    return name
+
+
+def prune(directory, keep):
+    files = [path for path in directory.iterdir() if path.suffix in SUFFIXES.values()]
+    files.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in files[keep:]:
+        path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.rate = setting('PROFILING_SAMPLE_RATE', 0.0)
+        self.token = setting('PROFILING_TOKEN', '')
+        if not self.rate and not self.token:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def requested(self, request):
+        header = request.headers.get('X-Profile')
+        return bool(self.token and header and hmac.compare_digest(header, self.token))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        requested = self.requested(request)
+        profiler = start_profiler() if requested or sampled(self.rate) else None
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, profiler, requested, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        # Profiles the event loop thread while the request is in flight: other
+        # requests' coroutines interleave into it, and ORM work done in
+        # sync_to_async threads is not in it.
+        requested = self.requested(request)
+        profiler = start_profiler() if requested or sampled(self.rate) else None
+        if profiler is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, profiler, requested, time.perf_counter() - started)
+
+    def finish(self, request, response, profiler, requested, elapsed):
+        match = request.resolver_match
+        name = save_profile(profiler, f"{request.method}-{match.view_name if match else request.path}", elapsed)
+        if requested:
+            response['X-Profile-File'] = name
+        return response
+
+
+_task_profiles = {}
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    if task.name in setting('PROFILING_TASKS', ()) and sampled(setting('PROFILING_TASK_SAMPLE_RATE', 1.0)):
+        profiler = start_profiler()
+        if profiler is not None:
+            _task_profiles[task_id] = (profiler, time.perf_counter())
+
+
+def task_finished(task_id=None, task=None, **kwargs):
+    entry = _task_profiles.pop(task_id, None)
+    if entry is not None:
+        profiler, started = entry
+        profiler.disable()
+        save_profile(profiler, task.name, time.perf_counter() - started)
+
+
+def connect_task_profiling():
+    """Hook task_prerun/task_postrun when PROFILING_TASKS names any task."""
+    if not setting('PROFILING_TASKS', ()):
+        return
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(task_started, weak=False, dispatch_uid='accounts.profiling.task_started')
+    task_postrun.connect(task_finished, weak=False, dispatch_uid='accounts.profiling.task_finished')
@@ -0,0 +1,123 @@
+"""Per-request SQL accounting.
+
+``QueryRecorder`` is installed with ``connection.execute_wrapper`` so it sees
+every query, whatever the value of DEBUG, and costs one function call per
+query. It keeps the count and total time of the queries it sees. It also
+groups queries by fingerprint, which is the SQL with literals and IN-lists
+collapsed. A fingerprint that runs more than once in one request is usually
+an N+1.
+
+Views declare how many queries they may run with ``@query_budget(n)``. The
+middleware reports against that number, and ``accounts.testing`` fails
+tests that exceed it.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with IN-lists, string and number literals collapsed, so repeats of one query compare equal."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _LITERALS.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """(fingerprint, times run) for queries run more than once, most repeated first."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+    @property
+    def duplicate_count(self):
+        # Executions beyond the first of each repeated query
+        return sum(count - 1 for _, count in self.duplicates)
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record queries on every configured database (or just ``using``) for the duration of the block."""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in [using] if using else connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@asynccontextmanager
+async def arecord_queries(using=None):
+    """record_queries for async code.
+
+    Connections are per thread, and the async ORM runs every query of a
+    request in that request's thread-sensitive worker thread. The wrappers
+    are therefore installed and removed from that same thread.
+    """
+    context = record_queries(using)
+    recorder = await sync_to_async(context.__enter__)()
+    try:
+        yield recorder
+    finally:
+        await sync_to_async(context.__exit__)(None, None, None)
+
+
+@contextmanager
+def record_request_queries(request):
+    """record_queries for one request, shared by every middleware that reports on it.
+
+    The outermost caller installs the wrappers and the ones inside it get the
+    same recorder, so each query pays for a single wrapper.
+    """
+    recorder = getattr(request, '_query_recorder', None)
+    if recorder is not None:
+        yield recorder
+        return
+    with record_queries() as recorder:
+        request._query_recorder = recorder
+        yield recorder
+
+
+@asynccontextmanager
+async def arecord_request_queries(request):
+    """record_request_queries for async middleware (see arecord_queries)."""
+    recorder = getattr(request, '_query_recorder', None)
+    if recorder is not None:
+        yield recorder
+        return
+    async with arecord_queries() as recorder:
+        request._query_recorder = recorder
+        yield recorder
+
+
+def query_budget(queries):
+    """Declare the most queries a view may run, counted by the middleware and by the test helper."""
+    def decorate(view):
+        view.query_budget = queries
+        return view
+    return decorate
+
+
+def budget_for(view):
+    return getattr(view, 'query_budget', None)
@@ -0,0 +1,200 @@
+"""Send safe reads of heavy pages to a read replica.
+
+``ReplicaRouter`` sends reads of this app's models to ``REPLICA_DATABASE``
+only inside a view decorated with ``@read_only_view``, and only for GET/HEAD
+requests. Sessions and users always stay on the primary, so a login is never
+lost to replication lag. Writes always go to the primary.
+
+After a request writes any of the app's tables, ``ReplicaRoutingMiddleware``
+sets a ``primary_until`` cookie for ``REPLICA_STICKY_SECONDS``. Until it
+expires that user's read-only pages also read from the primary, so a balance
+just changed never shows its old value. Writes are noticed as their
+statements run, by an execute wrapper on every connection, so raw SQL counts
+and merely asking the router where to write (as the admin's delete
+confirmation page does) does not.
+
+Local testing with two SQLite files: copy ``db.sqlite3`` to a second file
+and point ``REPLICA_SQLITE_PATH`` at it. Writes only reach the copy when
+you copy it again. The tests add a separate test database as the replica
+and write the rows it should serve with ``.using()``; a TEST MIRROR would
+make stale replica reads impossible to tell apart from primary ones.
+"""
+import functools
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+COOKIE_NAME = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_wrote = ContextVar('wrote', default=False)
+# The table a statement changes
+_WRITE = re.compile(r'\s*(?:INSERT (?:OR \w+ )?INTO|UPDATE|DELETE FROM) "?(\w+)', re.IGNORECASE)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+def routed(model):
+    return model._meta.app_label in getattr(settings, 'REPLICA_APPS', ('accounts',))
+
+
+@functools.cache
+def routed_tables():
+    return frozenset(model._meta.db_table for model in apps.get_models() if routed(model))
+
+
+def note_writes(execute, sql, params, many, context):
+    """Execute wrapper marking the current request as a writer when a statement changes a routed table."""
+    if not _wrote.get():
+        match = _WRITE.match(sql)
+        if match and match.group(1) in routed_tables():
+            _wrote.set(True)
+    return execute(sql, params, many, context)
+
+
+def watch_writes(sender, connection, **kwargs):
+    """connection_created receiver installing note_writes."""
+    if note_writes not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks, which pop the last wrapper, leave it in place
+        connection.execute_wrappers.insert(0, note_writes)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _wrote.get() and routed(model):
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+def pinned_to_primary(request):
+    try:
+        return float(request.COOKIES.get(COOKIE_NAME, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_stream(chunks, wrote):
+    # Streaming bodies run their queries after the view (and middleware) returned
+    previous = _replica_reads.get(), _wrote.get()
+    _replica_reads.set(True)
+    _wrote.set(wrote)
+    try:
+        yield from chunks
+    finally:
+        _replica_reads.set(previous[0])
+        _wrote.set(previous[1])
+
+
+async def areplica_stream(chunks, wrote):
+    previous = _replica_reads.get(), _wrote.get()
+    _replica_reads.set(True)
+    _wrote.set(wrote)
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        _replica_reads.set(previous[0])
+        _wrote.set(previous[1])
+
+
+def use_replica(request):
+    return request.method in SAFE_METHODS and replica_alias() is not None and not pinned_to_primary(request)
+
+
+def read_only_view(view):
+    """Run a safe request's reads on the replica, unless the user wrote recently."""
+    if iscoroutinefunction(view):
+        # sync_to_async copies the context into the ORM's thread, so the router sees the flag
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not use_replica(request):
+                return await view(request, *args, **kwargs)
+            token = _replica_reads.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not use_replica(request):
+            return view(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()  # admin changelists query while rendering
+            wrote = _wrote.get()
+        finally:
+            _replica_reads.reset(token)
+        if getattr(response, 'streaming', False):
+            stream = areplica_stream if response.is_async else replica_stream
+            response.streaming_content = stream(response.streaming_content, wrote)
+        return response
+    return wrapper
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            self.pin(response)
+        finally:
+            _wrote.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        # Writes made in the ORM's thread come back with sync_to_async's context
+        token = _wrote.set(False)
+        try:
+            response = await self.get_response(request)
+            self.pin(response)
+        finally:
+            _wrote.reset(token)
+        return response
+
+    def pin(self, response):
+        if _wrote.get():
+            seconds = sticky_seconds()
+            response.set_cookie(COOKIE_NAME, f"{time.time() + seconds:.0f}", max_age=seconds, httponly=True, samesite='Lax')
+
+
+class ReplicaChangelistMixin:
+    """ModelAdmin mixin serving changelist GETs from the replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        return read_only_view(super().changelist_view)(request, extra_context)
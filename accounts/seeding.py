@@ -0,0 +1,174 @@
+"""Synthetic data for benchmarks and load tests.
+
+Activity is skewed the way a real book is. A handful of merchant accounts
+receive a large share of all payments, and the remaining customer accounts
+follow a Pareto tail, so a few are very busy and most are quiet. Entries are
+generated in time order with a running balance per account, so no account
+is ever overdrawn. The final balance column agrees with the journal.
+
+Everything is written with bulk inserts. The journal goes through the
+importer's prepared ``executemany`` path.
+"""
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .importer import insert_entries
+from .interest import CENT
+from .models import Account, Loan
+from .numbering import AccountNumberAllocator, format_account_number
+
+DEFAULT_PASSWORD = 'seed-password'
+INSERT_BATCH_SIZE = 5000
+# Share of generated events of each kind; payments go to the merchant accounts
+EVENT_MIX = (('deposit', 35), ('withdrawal', 25), ('payment', 30), ('transfer', 10))
+LOAN_STATUS_MIX = (('pending', 45), ('approved', 35), ('rejected', 12), ('repaid', 8))
+
+
+@dataclass
+class SeedResult:
+    prefix: str
+    users: int = 0
+    accounts: int = 0
+    transactions: int = 0
+    loans: int = 0
+    merchant_account_ids: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def as_dict(self):
+        return {
+            'prefix': self.prefix,
+            'users': self.users,
+            'accounts': self.accounts,
+            'transactions': self.transactions,
+            'loans': self.loans,
+            'merchant_account_ids': self.merchant_account_ids,
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+def money(rng, mu=3.5, sigma=1.1, cap=Decimal('25000.00')):
+    # Lognormal amounts: mostly tens of units, occasionally thousands
+    return min(Decimal(rng.lognormvariate(mu, sigma)).quantize(CENT), cap) or CENT
+
+
+def create_users(prefix, count, password=DEFAULT_PASSWORD):
+    # Hashing once and sharing the hash keeps seeding from being all PBKDF2
+    password_hash = make_password(password)
+    users = [User(username=f"{prefix}{i:06d}", password=password_hash) for i in range(count)]
+    return User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+
+
+def create_accounts(owners, rng, now, savings_share=0.6):
+    """One unsaved Account per owner (a user may appear more than once)."""
+    first, _ = AccountNumberAllocator(block_size=len(owners)).reserve_block()
+    accounts = []
+    for offset, owner in enumerate(owners):
+        savings = rng.random() < savings_share
+        accounts.append(Account(
+            user=owner,
+            account_number=format_account_number(first + offset),
+            account_type='savings' if savings else 'current',
+            balance=Decimal('0.00'),
+            # Savings accounts are left due so the interest run has work to do
+            last_interest_calculation=now - timedelta(days=rng.randint(1, 30)) if savings else None,
+        ))
+    return accounts
+
+
+def generate_entries(customers, merchants, count, rng, start, end):
+    """Yield journal entries in time order as (account, type, amount, signed_amount, description, timestamp).
+
+    ``customers`` and ``merchants`` are Account instances whose ``balance``
+    is updated as entries are generated.
+    """
+    weights = [rng.paretovariate(1.2) for _ in customers]
+    span = (end - start).total_seconds()
+    kinds = [kind for kind, _ in EVENT_MIX]
+    kind_weights = [weight for _, weight in EVENT_MIX]
+    moments = sorted(rng.random() * span for _ in range(count))
+    picks = rng.choices(customers, weights=weights, k=count)
+    for moment, account, kind in zip(moments, picks, rng.choices(kinds, weights=kind_weights, k=count)):
+        timestamp = start + timedelta(seconds=moment)
+        amount = money(rng)
+        if kind != 'deposit' and account.balance < amount:
+            kind = 'deposit'  # nothing to spend yet
+        if kind == 'deposit':
+            account.balance += amount
+            yield account, 'deposit', amount, amount, None, timestamp
+        elif kind == 'withdrawal':
+            account.balance -= amount
+            yield account, 'withdrawal', amount, -amount, None, timestamp
+        else:
+            other = rng.choice(merchants) if kind == 'payment' else rng.choice(customers)
+            if other is account:
+                continue
+            account.balance -= amount
+            other.balance += amount
+            yield account, 'transfer', amount, -amount, f"Transferred to {other.account_number}", timestamp
+            yield other, 'transfer', amount, amount, f"Received from {account.account_number}", timestamp
+
+
+def create_loans(customers, count, rng, now):
+    statuses = [status for status, _ in LOAN_STATUS_MIX]
+    status_weights = [weight for _, weight in LOAN_STATUS_MIX]
+    loans = []
+    for account in rng.sample(customers, min(count, len(customers))):
+        loan = Loan(
+            user=account.user,
+            account=account,
+            amount=money(rng, mu=8.0, sigma=0.8, cap=Decimal('500000.00')),
+            interest_rate=Decimal(rng.choice([5, 7, 9, 12])),
+            duration_months=rng.choice([6, 12, 18, 24, 36]),
+            status=rng.choices(statuses, weights=status_weights)[0],
+            created_at=now,
+        )
+        if loan.status == 'approved':
+            loan.set_approval_terms()
+        elif loan.status == 'repaid':
+            loan.set_approval_terms()
+            loan.total_amount = Decimal('0.00')
+        loans.append(loan)
+    return Loan.objects.bulk_create(loans, batch_size=INSERT_BATCH_SIZE)
+
+
+def seed(users=1000, accounts=None, transactions=100000, loans=None, merchants=5, days=365, prefix='seed', random_seed=0):
+    """Create ``users`` customers plus ``merchants`` merchant accounts and their history."""
+    started = time.perf_counter()
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    accounts = accounts or int(users * 1.5)
+    loans = users // 4 if loans is None else loans
+    result = SeedResult(prefix=prefix)
+
+    with transaction.atomic():
+        customers = create_users(f"{prefix}-", users)
+        merchant_user = create_users(f"{prefix}-merchant-", 1)[0]
+        # Every user gets one account, the rest go to random users
+        owners = customers + [rng.choice(customers) for _ in range(max(accounts - users, 0))]
+        customer_accounts = create_accounts(owners, rng, now)
+        merchant_accounts = create_accounts([merchant_user] * merchants, rng, now, savings_share=0)
+
+        entries = list(generate_entries(customer_accounts, merchant_accounts, transactions, rng, now - timedelta(days=days), now))
+        all_accounts = Account.objects.bulk_create(customer_accounts + merchant_accounts, batch_size=INSERT_BATCH_SIZE)
+        for start in range(0, len(entries), INSERT_BATCH_SIZE):
+            insert_entries([
+                (account.pk, kind, amount, signed_amount, description, timestamp)
+                for account, kind, amount, signed_amount, description, timestamp in entries[start:start + INSERT_BATCH_SIZE]
+            ], timestamp=False)
+        result.loans = len(create_loans(customer_accounts, loans, rng, now))
+
+    result.users = len(customers) + 1
+    result.accounts = len(all_accounts)
+    result.transactions = len(entries)
+    result.merchant_account_ids = [account.pk for account in merchant_accounts]
+    result.elapsed = time.perf_counter() - started
+    return result
+
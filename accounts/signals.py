@@ -0,0 +1,51 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import authcache, dashboard
+from .models import Account, Loan, Transaction
+
+
+@receiver([post_save, post_delete], sender=Account)
+def account_changed(sender, instance, **kwargs):
+    dashboard.invalidate_users(instance.user_id)
+
+
+# No post_delete here: it would stop Django from fast-deleting transaction
+# rows in bulk, and deleted accounts already invalidate through account_changed.
+@receiver(post_save, sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    if Transaction.account.is_cached(instance):
+        dashboard.invalidate_users(instance.account.user_id)
+    else:
+        dashboard.invalidate_accounts([instance.account_id])
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def loan_changed(sender, instance, **kwargs):
+    dashboard.invalidate_users(instance.user_id)
+
+
+# Cached authenticated users (see authcache.py)
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    authcache.users.invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        authcache.users.invalidate(instance.pk)
+    elif pk_set is None:
+        authcache.users.clear()  # a group or permission was cleared of all its users
+    else:
+        authcache.users.invalidate(*pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        authcache.users.clear()
@@ -1,8 +1,37 @@
-from celery import shared_task
-from .models import Account
+from celery import chord, shared_task
+from django.utils import timezone
+from .models import InterestRun
+from .journal import roll_checkpoints
+from .archive import archive_transactions as archive_cold_transactions
+from .accrual import DEFAULT_CHUNK_SIZE, DEFAULT_SHARD_SIZE, finish_interest_run, plan_interest_run, run_interest_shard
 
 @shared_task
-def calculate_interest():
-    savings_accounts = Account.objects.filter(account_type='savings')
-    for account in savings_accounts:
-        account.calculate_interest()
\ No newline at end of file
+def calculate_interest(chunk_size=DEFAULT_CHUNK_SIZE, shard_size=DEFAULT_SHARD_SIZE):
+    run = plan_interest_run(timezone.localdate(), shard_size)
+    pending = list(run.shards.exclude(status='done').values_list('pk', flat=True))
+    if not pending:
+        finish_interest_run(run.pk)
+        return run.progress()
+    chord(calculate_interest_shard.s(shard_id, chunk_size) for shard_id in pending)(finish_interest_run_task.si(run.pk))
+    return {'run': run.pk, 'shards_dispatched': len(pending)}
+
+@shared_task(acks_late=True)
+def calculate_interest_shard(shard_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    return run_interest_shard(shard_id, chunk_size).as_dict()
+
+@shared_task
+def finish_interest_run_task(run_id):
+    return finish_interest_run(run_id)
+
+@shared_task
+def interest_run_progress(run_date=None):
+    run = InterestRun.objects.get(run_date=run_date or timezone.localdate())
+    return run.progress()
+
+@shared_task
+def roll_balance_checkpoints():
+    return roll_checkpoints()
+
+@shared_task
+def archive_transactions():
+    return archive_cold_transactions().as_dict()
@@ -0,0 +1,60 @@
+"""Test helpers for the query budgets declared on views (see queries.py).
+
+Inside a ``TestCase`` every ``atomic()`` block is a savepoint, so the counts
+here include SAVEPOINT/RELEASE statements that production requests do not
+run. Budgets on the views are declared as these tests see them.
+"""
+from django.urls import URLPattern, get_resolver, resolve, reverse
+
+from .queries import budget_for, record_queries
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def describe(recorder, limit=10):
+    lines = [f"{count}x {sql}" for sql, count in recorder.fingerprints.most_common(limit)]
+    return '\n'.join(lines)
+
+
+def assert_query_budget(client, url_name, args=None, kwargs=None, method='get', data=None, budget=None, **extra):
+    """Request ``url_name`` with ``client`` and fail if it runs more queries than the view's budget.
+
+    ``budget`` overrides the declared one. Returns the response.
+    """
+    url = reverse(url_name, args=args, kwargs=kwargs)
+    view = resolve(url).func
+    budget = budget if budget is not None else budget_for(view)
+    if budget is None:
+        raise QueryBudgetExceeded(f"{url_name} declares no query budget; decorate the view with @query_budget(n)")
+    with record_queries() as recorder:
+        response = getattr(client, method)(url, data or {}, **extra)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+    if recorder.count > budget:
+        raise QueryBudgetExceeded(
+            f"{method.upper()} {url_name} ran {recorder.count} queries, budget is {budget}:\n{describe(recorder)}"
+        )
+    return response
+
+
+def views_without_budget(urlconf='accounts.urls'):
+    """Names of the URL patterns in ``urlconf`` whose views declare no query budget."""
+    return [
+        pattern.name
+        for pattern in get_resolver(urlconf).url_patterns
+        if isinstance(pattern, URLPattern) and budget_for(pattern.callback) is None
+    ]
+
+
+class QueryBudgetMixin:
+    """``TestCase`` mixin adding ``assertQueryBudget`` and ``assertAllViewsBudgeted``."""
+
+    def assertQueryBudget(self, url_name, *args, client=None, **kwargs):
+        return assert_query_budget(client or self.client, url_name, *args, **kwargs)
+
+    def assertAllViewsBudgeted(self, urlconf='accounts.urls'):
+        missing = views_without_budget(urlconf)
+        if missing:
+            self.fail(f"Views without a query budget: {', '.join(missing)}")
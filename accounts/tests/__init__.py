@@ -0,0 +1,7 @@
+from decimal import Decimal
+
+from ..models import Account
+
+
+def make_account(user, number, balance='0.00', account_type='savings'):
+    return Account.objects.create(user=user, account_number=number, account_type=account_type, balance=Decimal(balance))
@@ -0,0 +1,111 @@
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import tasks
+from ..accrual import accrue_chunk, accrue_interest, finish_interest_run, plan_interest_run, run_interest_shard
+from ..interest import accrued_interest
+from ..models import Account, InterestRun, InterestShard, Transaction
+from . import make_account
+
+
+class InterestAccrualTests(TestCase):
+    # Balances chosen to land on and around half-cent boundaries
+    BALANCES = ['0.01', '0.73', '1.00', '36.50', '73.00', '99.99', '365.00', '1000.00', '1234.56', '99999.99', '7300000.00']
+    DAYS = [1, 2, 7, 30, 31, 183, 365, 400]
+
+    def test_chunked_accrual_matches_per_account_calculation(self):
+        user = User.objects.create_user('interest', password='pw')
+        now = timezone.now()
+        pairs = []
+        for balance in self.BALANCES:
+            for days in self.DAYS:
+                pair = [make_account(user, f"{kind}{len(pairs)}", balance) for kind in ('single', 'chunked')]
+                Account.objects.filter(pk__in=[account.pk for account in pair]).update(created_at=now - timedelta(days=days))
+                pairs.append(pair)
+
+        for single, _ in pairs:
+            single.refresh_from_db()
+            single.calculate_interest(now=now)
+        chunked_ids = [chunked.pk for _, chunked in pairs]
+        accrue_interest(chunk_size=7, now=now, after_pk=min(chunked_ids) - 1, last_pk=max(chunked_ids))
+
+        balances = dict(Account.objects.values_list('pk', 'balance'))
+        for single, chunked in pairs:
+            self.assertEqual(balances[chunked.pk], balances[single.pk])
+        interest = dict(Transaction.objects.filter(transaction_type='interest').values_list('account_id', 'amount'))
+        for single, chunked in pairs:
+            self.assertEqual(interest.get(chunked.pk), interest.get(single.pk))
+        self.assertEqual(balances[pairs[-1][0].pk], Decimal('7700000.00'))
+
+
+class InterestRunTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('shards', password='pw')
+        self.accounts = [make_account(user, f"run{index}", '1000.00') for index in range(10)]
+        self.ids = [account.pk for account in self.accounts]
+        Account.objects.filter(pk__in=self.ids).update(created_at=timezone.now() - timedelta(days=30))
+        self.interest = accrued_interest(Decimal('1000.00'), 30)
+
+    def assertCreditedOnce(self):
+        entries = Counter(Transaction.objects.filter(transaction_type='interest').values_list('account_id', flat=True))
+        self.assertEqual(entries, Counter(self.ids))
+        balances = set(Account.objects.filter(pk__in=self.ids).values_list('balance', flat=True))
+        self.assertEqual(balances, {Decimal('1000.00') + self.interest})
+
+    def test_a_shard_resumes_after_its_checkpoint(self):
+        run = plan_interest_run(shard_size=4)
+        shards = list(run.shards.order_by('first_pk'))
+        self.assertEqual([(shard.first_pk, shard.last_pk) for shard in shards], [
+            (self.ids[0], self.ids[3]), (self.ids[4], self.ids[7]), (self.ids[8], self.ids[9]),
+        ])
+        calls = []
+
+        def crash_on_second_chunk(rows, now):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("worker lost")
+            return accrue_chunk(rows, now)
+
+        with mock.patch('accounts.accrual.accrue_chunk', crash_on_second_chunk), self.assertRaises(RuntimeError):
+            run_interest_shard(shards[0].pk, chunk_size=2)
+        shards[0].refresh_from_db()
+        self.assertEqual((shards[0].status, shards[0].checkpoint_pk, shards[0].credited), ('running', self.ids[1], 2))
+
+        for shard in shards:
+            run_interest_shard(shard.pk, chunk_size=2)
+        # A redelivered task for a finished shard does nothing
+        self.assertEqual(run_interest_shard(shards[0].pk).accounts, 0)
+        self.assertTrue(finish_interest_run(run.pk))
+        self.assertCreditedOnce()
+        run.refresh_from_db()
+        self.assertEqual(run.progress(), {
+            'shards': 3, 'shards_done': 3, 'accounts': 10, 'credited': 10,
+            'interest_total': str(self.interest * 10), 'status': 'done',
+        })
+
+    def test_rerunning_the_same_run_date_credits_nothing_more(self):
+        def chord(header):
+            # The shard tasks, then the callback, run in-process as a worker would
+            def dispatch(body):
+                for signature in header:
+                    signature.apply()
+                body.apply()
+            return dispatch
+
+        with mock.patch.object(tasks, 'chord', chord):
+            dispatched = tasks.calculate_interest(chunk_size=3, shard_size=4)
+            self.assertEqual(dispatched['shards_dispatched'], 3)
+            run = InterestRun.objects.get()
+            self.assertEqual(run.status, 'done')
+            again = tasks.calculate_interest(chunk_size=3, shard_size=4)
+        self.assertEqual(InterestRun.objects.count(), 1)
+        self.assertEqual(InterestShard.objects.count(), 3)
+        self.assertEqual((again['accounts'], again['credited'], again['shards_done']), (10, 10, 3))
+        self.assertEqual(plan_interest_run(), run)
+        self.assertCreditedOnce()
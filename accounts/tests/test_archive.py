@@ -0,0 +1,95 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import journal, ledger
+from ..archive import archive_transactions
+from ..models import ArchivedTransaction, Transaction
+from ..pagination import paginate
+from . import make_account
+
+TODAY = date(2025, 6, 15)
+
+
+def stamp(year, month, day=10):
+    return timezone.make_aware(datetime.combine(date(year, month, day), time(12)))
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.account = make_account(User.objects.create_user('archive', password='pw'), '1500')
+        # One entry a month from January to August 2024, then a checkpoint over them
+        for month in range(1, 9):
+            self.record(Decimal(month) / 10, stamp(2024, month))
+        journal.roll_checkpoints(lag_seconds=0)
+        self.covered_to = Transaction.objects.order_by('-id').values_list('id', flat=True).first()
+        # Recorded after the checkpoint, so not covered even though they are old
+        self.record(Decimal('5.00'), stamp(2024, 2, 20))
+        ledger.withdraw(self.account, Decimal('1.25'))
+
+    def record(self, amount, timestamp):
+        ledger.deposit(self.account, amount)
+        Transaction.objects.filter(pk=Transaction.objects.order_by('-id').values_list('id', flat=True)[:1]).update(timestamp=timestamp)
+
+    def history_ids(self):
+        return [row.pk for row in Transaction.objects.with_archive().filter(account=self.account).order_by('-timestamp', '-pk')]
+
+    def test_only_checkpointed_entries_before_the_horizon_move(self):
+        result = archive_transactions(months=12, batch_size=2, today=TODAY)
+        self.assertEqual(result.horizon, date(2024, 6, 1))
+        self.assertEqual(result.moved, 5)
+        self.assertEqual(result.batches, 5)
+        archived = ArchivedTransaction.objects.values_list('timestamp', flat=True)
+        self.assertEqual(sorted(timezone.localtime(timestamp).month for timestamp in archived), [1, 2, 3, 4, 5])
+        self.assertFalse(ArchivedTransaction.objects.filter(id__gt=self.covered_to).exists())
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_entries_keep_their_ids_and_signed_amounts(self):
+        fields = ('id', 'account_id', 'transaction_type', 'amount', 'timestamp', 'description', 'loan_id', 'signed_amount')
+        before = sorted(Transaction.objects.filter(timestamp__lt=stamp(2024, 6, 1), id__lte=self.covered_to).values_list(*fields))
+        archive_transactions(months=12, today=TODAY)
+        self.assertEqual(sorted(ArchivedTransaction.objects.values_list(*fields)), before)
+        self.assertEqual(sorted(ArchivedTransaction.objects.values_list('archive_month', flat=True)), [date(2024, month, 1) for month in range(1, 6)])
+
+    def test_journal_balances_are_unchanged_by_archiving(self):
+        moments = [stamp(2024, month, 28) for month in range(1, 9)] + [timezone.now()]
+        before = [journal.balance_as_of(self.account, when) for when in moments]
+        self.assertEqual(journal.audit_balances(), [])
+        archive_transactions(months=12, today=TODAY)
+        self.assertEqual([journal.balance_as_of(self.account, when) for when in moments], before)
+        self.assertEqual(journal.audit_balances(), [])
+        self.assertEqual(before[-1], Decimal('7.35'))
+
+    def test_rerunning_moves_nothing_more(self):
+        first = archive_transactions(months=12, today=TODAY)
+        history = self.history_ids()
+        second = archive_transactions(months=12, today=TODAY)
+        self.assertEqual((first.moved, second.moved, second.batches), (5, 0, 0))
+        self.assertEqual(self.history_ids(), history)
+        self.assertEqual(ArchivedTransaction.objects.count(), 5)
+
+    def test_keyset_pages_cross_the_archive_boundary_without_gaps(self):
+        expected = self.history_ids()
+        archive_transactions(months=12, today=TODAY)
+        self.assertEqual(self.history_ids(), expected)
+        history = Transaction.objects.with_archive().filter(account=self.account)
+        seen, page = [], paginate(history, page_size=3)
+        while True:
+            seen.extend(row.pk for row in page)
+            if not page.has_next:
+                break
+            page = paginate(history, after=page.next_cursor, page_size=3)
+        self.assertEqual(seen, expected)
+
+    def test_a_page_is_limited_in_each_table(self):
+        archive_transactions(months=12, today=TODAY)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(Transaction.objects.with_archive().filter(account=self.account).order_by('-timestamp', '-pk')[:3])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]['sql'].count('LIMIT 3'), 3)
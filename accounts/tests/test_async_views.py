@@ -0,0 +1,30 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from .. import async_views
+from . import make_account
+
+
+class AsyncOwnershipTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        self.account = make_account(self.owner, '300', '50.00')
+
+    def test_async_transaction_history_requires_the_owner(self):
+        def get(user):
+            request = AsyncRequestFactory().get(reverse('transaction_history', args=[self.account.pk]))
+            request.user = user
+
+            async def auser():
+                return user
+            request.auser = auser
+            return async_to_sync(async_views.transaction_history)(request, self.account.pk)
+
+        self.assertEqual(get(AnonymousUser()).status_code, 302)
+        with self.assertRaises(Http404):
+            get(self.other)
+        self.assertEqual(get(self.owner).status_code, 200)
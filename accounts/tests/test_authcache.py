@@ -0,0 +1,80 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import authcache
+
+USER_TABLE = User._meta.db_table
+
+
+@override_settings(AUTH_USER_CACHE_SECONDS=60)
+class UserCacheTests(TestCase):
+    def setUp(self):
+        authcache.users.clear()
+        self.user = User.objects.create_user('cached', password='pw')
+        self.permission = Permission.objects.get(codename='view_account')
+
+    def entries(self):
+        return authcache.users.as_dict()['entries']
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return [query for query in queries if f'FROM "{USER_TABLE}"' in query['sql']]
+
+    def test_entries_are_keyed_by_session_auth_hash(self):
+        key = authcache.entry_key(self.user.pk, 'backend', self.user.get_session_auth_hash())
+        authcache.users.set(key, self.user, 60)
+        self.assertIsNotNone(authcache.users.get(key))
+        self.assertIsNone(authcache.users.get(authcache.entry_key(self.user.pk, 'backend', 'stale-hash')))
+        self.assertIsNone(authcache.entry_key(self.user.pk, 'backend', ''))
+
+    def test_cache_saves_the_user_query(self):
+        self.client.force_login(self.user)
+        self.user_queries()
+        with self.settings(AUTH_USER_CACHE_SECONDS=0):
+            uncached = self.user_queries()
+        cached = self.user_queries()
+        self.assertEqual(len(uncached), 1)
+        self.assertEqual(cached, [])
+        self.assertGreaterEqual(authcache.users.hits, 1)
+
+    def test_password_change_logs_out_old_sessions(self):
+        self.client.force_login(self.user)
+        self.user_queries()
+        self.assertEqual(self.entries(), 1)
+        self.user.set_password('new-pw')
+        self.user.save()
+        self.assertEqual(self.entries(), 0)
+        response = self.client.get(reverse('home'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('home')}", fetch_redirect_response=False)
+
+    def test_permission_changes_drop_entries(self):
+        self.client.force_login(self.user)
+        self.user_queries()
+        self.user.user_permissions.add(self.permission)
+        self.assertEqual(self.entries(), 0)
+
+        group = Group.objects.create(name='tellers')
+        self.user.groups.add(group)
+        self.user_queries()
+        self.assertEqual(self.entries(), 1)
+        group.permissions.add(self.permission)
+        self.assertEqual(self.entries(), 0)
+
+        self.user_queries()
+        group.user_set.clear()
+        self.assertEqual(self.entries(), 0)
+
+    def test_each_request_gets_its_own_copy(self):
+        key = authcache.entry_key(self.user.pk, 'backend', self.user.get_session_auth_hash())
+        authcache.users.set(key, self.user, 60)
+        first, second = authcache.users.get(key), authcache.users.get(key)
+        self.assertIsNot(first, second)
+        first._perm_cache = {'accounts.view_account'}
+        first.first_name = 'changed'
+        self.assertFalse(hasattr(second, '_perm_cache'))
+        self.assertEqual(authcache.users.get(key).first_name, '')
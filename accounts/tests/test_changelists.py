@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Account, Transaction
+from . import make_account
+
+TRANSACTIONS = Transaction._meta.db_table
+ACCOUNTS = Account._meta.db_table
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=5)
+class ChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='pw')
+        self.client.force_login(self.admin)
+        owner = User.objects.create_user('holder', password='pw')
+        self.accounts = [make_account(owner, number) for number in ('1900', '1901', '1910', '2900')]
+        Transaction.objects.bulk_create([
+            Transaction(account=self.accounts[0], transaction_type='deposit', amount=Decimal(amount), signed_amount=Decimal(amount))
+            for amount in range(1, 9)
+        ])
+
+    def changelist(self, model, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:accounts_{model}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], [query['sql'] for query in queries]
+
+    def test_a_filtered_count_stops_at_the_limit(self):
+        cl, queries = self.changelist('transaction', transaction_type__exact='deposit')
+        self.assertEqual(cl.result_count, 5)
+        counts = [sql for sql in queries if 'COUNT(' in sql and TRANSACTIONS in sql]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 5', counts[0])
+
+    def test_an_unfiltered_count_uses_the_table_estimate(self):
+        cl, queries = self.changelist('transaction')
+        self.assertEqual(cl.result_count, 5)  # no statistics yet: capped exact count
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(TRANSACTIONS)}')
+        cl, queries = self.changelist('transaction')
+        self.assertEqual(cl.result_count, 8)
+        self.assertEqual([sql for sql in queries if 'COUNT(' in sql and TRANSACTIONS in sql], [])
+
+    def test_search_matches_exactly_or_by_prefix_without_like(self):
+        cl, queries = self.changelist('account', q='1901')
+        self.assertEqual([account.account_number for account in cl.result_list], ['1901'])
+        cl, prefix_queries = self.changelist('account', q='19*')
+        self.assertEqual(sorted(account.account_number for account in cl.result_list), ['1900', '1901', '1910'])
+        cl, _ = self.changelist('account', q='holder')
+        self.assertEqual(len(cl.result_list), 4)
+        self.assertEqual(self.changelist('account', q='190')[0].result_list.count(), 0)
+        # PostgreSQL answers the prefix from its pattern index with LIKE 'x%'; no other search uses LIKE
+        searched = [sql for sql in queries + (prefix_queries if connection.vendor == 'sqlite' else []) if ACCOUNTS in sql]
+        self.assertTrue(searched)
+        for sql in searched:
+            self.assertNotIn(' LIKE ', sql)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import dashboard, ledger
+from ..accrual import accrue_interest
+from ..models import Account, Loan, Transaction
+from . import make_account
+
+DASHBOARD_TABLES = [model._meta.db_table for model in (Account, Transaction, Loan)]
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        dashboard.get_cache().clear()
+        dashboard.stats.reset()
+        self.user = User.objects.create_user('dashboard', password='pw')
+        self.account = make_account(self.user, '1700', '20.00')
+
+    def version(self):
+        return dashboard._current_version(dashboard.get_cache(), self.user.pk)
+
+    def assertInvalidatedOnCommit(self, write):
+        version = self.version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            write()
+            self.assertEqual(self.version(), version, "bumped before commit")
+        self.assertTrue(callbacks)
+        self.assertNotEqual(self.version(), version)
+
+    def test_hits_and_misses_are_counted(self):
+        first = dashboard.get_dashboard(self.user)
+        second = dashboard.get_dashboard(self.user)
+        self.assertEqual([account.pk for account in second['accounts']], [account.pk for account in first['accounts']])
+        self.assertEqual(dashboard.stats.as_dict(), {'hits': 1, 'misses': 1, 'invalidations': 0})
+
+    def test_a_second_home_load_runs_no_dashboard_queries(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        tables = [table for query in queries for table in DASHBOARD_TABLES if table in query['sql']]
+        self.assertEqual(tables, [])
+        self.assertEqual(dashboard.stats.hits, 1)
+
+    def test_model_saves_invalidate_after_commit(self):
+        self.assertInvalidatedOnCommit(lambda: make_account(self.user, '1701'))
+        self.assertInvalidatedOnCommit(lambda: Transaction.objects.create(account=self.account, transaction_type='deposit', amount=Decimal('1.00'), signed_amount=Decimal('1.00')))
+        loan = Loan(user=self.user, account=self.account, amount=Decimal('10.00'), interest_rate=Decimal('5.00'))
+        self.assertInvalidatedOnCommit(loan.save)
+
+    def test_ledger_and_bulk_writes_invalidate_after_commit(self):
+        other = make_account(User.objects.create_user('payee', password='pw'), '1800')
+        self.assertInvalidatedOnCommit(lambda: ledger.deposit(self.account, Decimal('5.00')))
+        self.assertInvalidatedOnCommit(lambda: ledger.transfer(self.account, other, Decimal('1.00')))
+        Account.objects.filter(pk=self.account.pk).update(created_at=timezone.now() - timedelta(days=30))
+        self.assertInvalidatedOnCommit(lambda: accrue_interest(after_pk=self.account.pk - 1, last_pk=self.account.pk))
+        self.assertEqual(Transaction.objects.filter(account=self.account, transaction_type='interest').count(), 1)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..importer import import_file
+from ..models import Account, Transaction
+from . import make_account
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        self.account = make_account(User.objects.create_user('importer', password='pw'), '1100')
+
+    def run_import(self, lines, chunk_size=2):
+        with tempfile.TemporaryDirectory() as directory:
+            path, rejects = os.path.join(directory, 'batch.ndjson'), os.path.join(directory, 'rejects.csv')
+            with open(path, 'w') as handle:
+                handle.write('\n'.join(lines))
+            result = import_file(path, rejects, chunk_size=chunk_size)
+            with open(rejects) as handle:
+                errors = [line.rstrip('\r\n').rsplit(',', 1) for line in handle][1:]
+        return result, [(line.split(',')[0], error) for line, error in errors]
+
+    def test_non_object_json_lines_are_rejected(self):
+        result, errors = self.run_import([
+            '[1, 2]',
+            '"x"',
+            '{"account_number": "1100", "transaction_type": "deposit", "amount": "5.00"}',
+            '{"account_number": "1100", "transaction_type": ',
+        ])
+        self.assertEqual((result.rows, result.imported, result.rejected), (4, 1, 3))
+        self.assertEqual(errors, [
+            ('1', "JSON line is not an object."), ('2', "JSON line is not an object."), ('4', "Malformed JSON line."),
+        ])
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('5.00'))
+
+    def test_json_values_of_the_wrong_type_are_rejected_per_row(self):
+        result, errors = self.run_import([
+            '{"account_number": 1100, "transaction_type": "deposit", "amount": 2.5}',
+            '{"account_number": "1100", "transaction_type": "deposit", "amount": "1.00", "description": ["a", "b"]}',
+            '{"account_number": "1100", "transaction_type": 7, "amount": "1.00"}',
+            '{"account_number": "1100", "transaction_type": "deposit", "amount": "1.00", "description": {"a": 1}}',
+            '{"account_number": "1100", "transaction_type": "deposit", "amount": "3.00", "description": 42}',
+        ])
+        self.assertEqual((result.rows, result.imported, result.rejected), (5, 2, 3))
+        self.assertEqual(errors, [
+            ('2', "description must be text or a number."),
+            ('3', "transaction_type must be deposit or withdrawal."),
+            ('4', "description must be text or a number."),
+        ])
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('5.50'))
+        self.assertEqual(sorted(Transaction.objects.values_list('amount', 'description')), [(Decimal('2.50'), None), (Decimal('3.00'), '42')])
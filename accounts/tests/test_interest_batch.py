@@ -0,0 +1,34 @@
+import random
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+from django.test import TestCase
+
+from ..interest import accrued_interest
+from ..interest_batch import accrued_interest_cents, from_cents, to_basis_points, to_cents
+
+
+class InterestBatchTests(TestCase):
+    RATES = [Decimal('0.0001'), Decimal('0.0125'), Decimal('0.05'), Decimal('0.0725'), Decimal('0.1999'), Decimal('1')]
+
+    def test_vectorized_matches_decimal_arithmetic(self):
+        rng = random.Random(20240101)
+        balances = [Decimal(cents).scaleb(-2) for cents in [1, 50, 73, 100, 3650, 7300, 36500, 123456, 10 ** 12]]
+        balances += [Decimal(rng.randrange(1, 10 ** 10)).scaleb(-2) for _ in range(300)]
+        days = [1, 2, 30, 73, 146, 365, 366, 1000]
+        cases = [(balance, day, rate) for balance in balances for day in days for rate in self.RATES]
+        for rounding in (ROUND_HALF_EVEN, ROUND_HALF_UP):
+            cents = accrued_interest_cents(
+                [to_cents(balance) for balance, _, _ in cases],
+                [day for _, day, _ in cases],
+                [to_basis_points(rate) for _, _, rate in cases],
+                rounding=rounding,
+            )
+            for (balance, day, rate), result in zip(cases, cents.tolist()):
+                expected = accrued_interest(balance, day, rate=rate, rounding=rounding)
+                self.assertEqual(from_cents(result), expected, f"{balance} for {day} days at {rate} ({rounding})")
+
+    def test_rounding_modes_differ_on_exact_half_cents(self):
+        tie = Decimal('18250.00')  # 1825000 cents * 1 bp * 1 day / 3650000 = exactly half a cent
+        for rounding, expected in ((ROUND_HALF_EVEN, Decimal('0.00')), (ROUND_HALF_UP, Decimal('0.01'))):
+            self.assertEqual(accrued_interest(tie, 1, rate=Decimal('0.0001'), rounding=rounding), expected)
+            self.assertEqual(from_cents(accrued_interest_cents([to_cents(tie)], [1], [1], rounding=rounding)[0]), expected)
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import journal, ledger
+from ..models import Account, BalanceCheckpoint
+from . import make_account
+
+
+class JournalAuditTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('journal', password='pw')
+        self.first = make_account(user, '800')
+        self.second = make_account(user, '900')
+
+    def record_activity(self):
+        for amount in ('0.10', '0.20', '1005.48', '0.07'):
+            ledger.deposit(self.first, Decimal(amount))
+        ledger.withdraw(self.first, Decimal('0.33'))
+        ledger.transfer(self.first, self.second, Decimal('0.11'))
+        # 0.10 + 0.20 is 0.30000000000000004 in SQLite's floating point
+        ledger.deposit(self.second, Decimal('0.10'))
+        ledger.deposit(self.second, Decimal('0.20'))
+
+    def test_balances_match_the_journal_after_checkpointing(self):
+        self.record_activity()
+        self.assertEqual(journal.audit_balances(), [])
+        self.assertEqual(journal.roll_checkpoints(lag_seconds=0), 2)
+        self.assertEqual(journal.audit_balances(), [])
+        self.assertEqual(
+            sorted(BalanceCheckpoint.objects.values_list('account_id', 'balance')),
+            [(self.first.pk, Decimal('1005.41')), (self.second.pk, Decimal('0.41'))],
+        )
+        ledger.deposit(self.first, Decimal('0.01'))
+        self.assertEqual(journal.audit_balances(), [])
+        self.assertEqual(journal.rebuild_balances(), 0)
+        self.assertEqual(journal.balance_as_of(self.first, timezone.now()), Decimal('1005.42'))
+
+    def test_drifted_balance_is_detected(self):
+        self.record_activity()
+        journal.roll_checkpoints(lag_seconds=0)
+        Account.objects.filter(pk=self.second.pk).update(balance=Decimal('0.42'))
+        self.assertEqual(journal.audit_balances(), [(self.second.pk, Decimal('0.42'), Decimal('0.41'))])
+        self.assertEqual(journal.rebuild_balances(), 1)
+        self.assertEqual(Account.objects.get(pk=self.second.pk).balance, Decimal('0.41'))
+        self.assertEqual(journal.audit_balances(), [])
@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import ledger
+from ..models import Account, Loan, Transaction
+from . import make_account
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ledger', password='pw')
+        self.source = make_account(self.user, '100', '50.00')
+        self.destination = make_account(self.user, '200', '10.00')
+
+    def assertBalances(self, source, destination):
+        balances = dict(Account.objects.values_list('pk', 'balance'))
+        self.assertEqual((balances[self.source.pk], balances[self.destination.pk]), (Decimal(source), Decimal(destination)))
+
+    def test_overdraft_is_rejected(self):
+        with self.assertRaises(ledger.InsufficientBalance):
+            ledger.transfer(self.source, self.destination, Decimal('50.01'))
+        with self.assertRaises(ledger.InsufficientBalance):
+            ledger.withdraw(self.source, Decimal('50.01'))
+        self.assertBalances('50.00', '10.00')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_self_transfer_is_rejected(self):
+        with self.assertRaises(ledger.SameAccountTransfer):
+            ledger.transfer(self.source, self.source, Decimal('5.00'))
+        self.assertBalances('50.00', '10.00')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_transfer_writes_two_entries_that_sum_to_zero(self):
+        ledger.transfer(self.source, self.destination, Decimal('20.00'))
+        entries = list(Transaction.objects.values_list('account_id', 'transaction_type', 'amount', 'signed_amount'))
+        self.assertEqual(sorted(entries), sorted([
+            (self.source.pk, 'transfer', Decimal('20.00'), Decimal('-20.00')),
+            (self.destination.pk, 'transfer', Decimal('20.00'), Decimal('20.00')),
+        ]))
+        self.assertEqual(sum(signed for *_, signed in entries), Decimal('0.00'))
+        self.assertBalances('30.00', '30.00')
+
+    def test_repayment_above_outstanding_is_refused(self):
+        loan = Loan.objects.create(user=self.user, account=self.source, amount=Decimal('20.00'), interest_rate=Decimal('5.00'))
+        ledger.approve_loans(Loan.objects.filter(pk=loan.pk))
+        loan.refresh_from_db()
+        balance = Account.objects.get(pk=self.source.pk).balance
+        with self.assertRaises(ledger.LoanOverpayment):
+            ledger.repay_loan(loan, loan.total_amount + Decimal('0.01'))
+        self.assertEqual(Loan.objects.get(pk=loan.pk).total_amount, loan.total_amount)
+        self.assertEqual(Account.objects.get(pk=self.source.pk).balance, balance)
+        self.assertFalse(Transaction.objects.filter(transaction_type='repayment').exists())
+
+
+class AccountOwnershipTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='pw')
+        self.other = User.objects.create_user('other', password='pw')
+        self.account = make_account(self.owner, '300', '50.00')
+        self.payee = make_account(self.other, '400')
+
+    def test_transfer_requires_the_owner(self):
+        url = reverse('transfer', args=[self.account.pk])
+        data = {'amount': '10.00', 'to_account': self.payee.account_number}
+        self.assertRedirects(self.client.post(url, data), f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post(url, data).status_code, 404)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('50.00'))
+        self.client.force_login(self.owner)
+        self.assertRedirects(self.client.post(url, data), reverse('view_account'), fetch_redirect_response=False)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('40.00'))
+
+    def test_transaction_history_requires_the_owner(self):
+        url = reverse('transaction_history', args=[self.account.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..models import Account, Loan, Transaction
+from . import make_account
+
+
+class LoanTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('borrower', password='pw')
+        self.account = make_account(self.user, '700')
+        self.loan = Loan.objects.create(user=self.user, account=self.account, amount=Decimal('100.00'), interest_rate=Decimal('10.00'))
+
+    def test_partial_refresh_keeps_a_pending_status_change(self):
+        self.loan.status = 'approved'
+        self.loan.refresh_from_db(fields=['amount'])
+        self.loan.save()
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.status, 'approved')
+        self.assertEqual(self.loan.total_amount, Decimal('110.00'))
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('100.00'))
+
+    def test_refresh_of_the_status_is_remembered(self):
+        Loan.objects.filter(pk=self.loan.pk).update(status='rejected')
+        self.loan.refresh_from_db(fields=['status'])
+        self.loan.save()
+        self.assertEqual(self.loan.loaded_value('status'), 'rejected')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_saving_other_fields_does_not_transition(self):
+        self.loan.status = 'approved'
+        self.loan.duration_months = 24
+        self.loan.save(update_fields=['duration_months'])
+        self.assertEqual(self.loan.loaded_value('status'), 'pending')
+        self.assertEqual(Loan.objects.values_list('status', 'duration_months').get(pk=self.loan.pk), ('pending', 24))
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('0.00'))
+        self.loan.save(update_fields=['status'])
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, Decimal('100.00'))
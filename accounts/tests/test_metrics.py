@@ -0,0 +1,74 @@
+import gc
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics, queries
+
+
+class MetricTests(SimpleTestCase):
+    def test_counters_and_histograms_render_in_the_text_format(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter('test_events_total', "Events.", ('kind',)))
+        histogram = registry.register(metrics.Histogram('test_seconds', "Durations.", ('view',), buckets=(0.1, 1)))
+        counter.inc('a "quoted"\nkind')
+        counter.inc('b', amount=2.5)
+        histogram.observe('home', value=0.05)
+        histogram.observe('home', value=0.5)
+        histogram.observe('home', value=3)
+        self.assertEqual(registry.render(), '\n'.join([
+            '# HELP test_events_total Events.',
+            '# TYPE test_events_total counter',
+            'test_events_total{kind="a \\"quoted\\"\\nkind"} 1',
+            'test_events_total{kind="b"} 2.5',
+            '# HELP test_seconds Durations.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="home",le="0.1"} 1',
+            'test_seconds_bucket{view="home",le="1"} 2',
+            'test_seconds_bucket{view="home",le="+Inf"} 3',
+            'test_seconds_sum{view="home"} 3.55',
+            'test_seconds_count{view="home"} 3',
+        ]) + '\n')
+
+    def test_concurrent_increments_are_all_counted_after_their_threads_exit(self):
+        counter = metrics.Counter('test_concurrent_total', "Concurrent events.")
+        histogram = metrics.Histogram('test_concurrent_seconds', "Concurrent durations.", buckets=(1,))
+        start = threading.Barrier(8)
+
+        def record():
+            start.wait()
+            for _ in range(1000):
+                counter.inc()
+                histogram.observe(value=0.5)
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        self.assertEqual(counter.collect(), {(): 8000})
+        self.assertEqual(histogram.collect(), {(): [8000, 0, 4000.0, 8000]})
+        self.assertEqual((len(counter._shards), len(histogram._shards)), (0, 0))
+        counter.inc()
+        self.assertEqual(counter.collect(), {(): 8001})
+        self.assertEqual(len(counter._shards), 1)
+
+
+class MetricsMiddlewareTests(TestCase):
+    @override_settings(QUERY_INSTRUMENTATION='headers')
+    def test_one_recorder_is_shared_with_the_query_count_middleware(self):
+        user = User.objects.create_user('metrics', password='pw', is_staff=True)
+        self.client.force_login(user)
+        with mock.patch.object(queries, 'QueryRecorder', wraps=queries.QueryRecorder) as recorder:
+            response = self.client.get(reverse('loan_status'))
+        self.assertEqual(recorder.call_count, 1)
+        observed = metrics.request_queries.collect()[('loan_status',)]
+        self.assertGreaterEqual(observed[-2], int(response['X-DB-Queries']))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'bank_db_queries_per_request_count{view="loan_status"}', response.content)
@@ -0,0 +1,65 @@
+import os
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase
+
+from .. import numbering
+from ..models import Account, AccountNumberCounter
+from ..numbering import AccountNumberAllocator, format_account_number, is_valid_account_number, luhn_check_digit
+from . import make_account
+
+
+class AccountNumberFormatTests(SimpleTestCase):
+    def test_luhn_check_digit_matches_known_numbers(self):
+        self.assertEqual(luhn_check_digit('7992739871'), '3')
+        self.assertEqual(luhn_check_digit('411111111111111'), '1')
+        self.assertEqual(luhn_check_digit('0000000000000'), '0')
+
+    def test_numbers_are_padded_serials_with_a_check_digit(self):
+        number = format_account_number(1000000000042)
+        self.assertEqual(number[:-1], '1000000000042')
+        self.assertTrue(is_valid_account_number(number))
+        self.assertFalse(is_valid_account_number(number[:-1] + str((int(number[-1]) + 1) % 10)))
+        self.assertEqual(len(format_account_number(1)), 14)
+
+    def test_serials_that_do_not_fit_are_refused(self):
+        self.assertEqual(format_account_number(10 ** 13 - 1)[:-1], '9' * 13)
+        with self.assertRaises(ValueError):
+            format_account_number(10 ** 13)
+
+
+class AccountNumberAllocatorTests(TestCase):
+    def counter(self, series):
+        return AccountNumberCounter.objects.get(name=series).next_value
+
+    def test_serials_come_from_reserved_blocks(self):
+        allocator = AccountNumberAllocator(series='blocks', block_size=3, start=100)
+        serials = [allocator.next_serial() for _ in range(4)]
+        self.assertEqual(serials, [100, 101, 102, 103])
+        self.assertEqual(self.counter('blocks'), 106)
+        # A second process gets the next block, never one of these serials
+        other = AccountNumberAllocator(series='blocks', block_size=3, start=100)
+        self.assertEqual(other.next_serial(), 106)
+        self.assertEqual(self.counter('blocks'), 109)
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate(), format_account_number(104))
+
+    def test_a_forked_process_reserves_its_own_block(self):
+        allocator = AccountNumberAllocator(series='fork', block_size=5, start=100)
+        self.assertEqual(allocator.next_serial(), 100)
+        with mock.patch.object(numbering.os, 'getpid', return_value=os.getpid() + 1):
+            self.assertEqual(allocator.next_serial(), 105)
+        self.assertEqual(self.counter('fork'), 110)
+
+    def test_saving_skips_numbers_already_taken(self):
+        user = User.objects.create_user('numbers', password='pw')
+        make_account(user, format_account_number(500))
+        with mock.patch.object(numbering, 'allocator', AccountNumberAllocator(series='retry', block_size=10, start=500)):
+            account = numbering.save_with_account_number(Account(user=user, account_type='savings'))
+            self.assertEqual(account.account_number, format_account_number(501))
+            make_account(user, format_account_number(502))
+            with self.assertRaises(IntegrityError):
+                numbering.save_with_account_number(Account(user=user, account_type='savings'), attempts=1)
+        self.assertEqual(Account.objects.filter(user=user).count(), 3)
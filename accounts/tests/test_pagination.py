@@ -0,0 +1,54 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Transaction
+from ..pagination import MAX_PK, decode_cursor, encode_cursor, page_size_from, paginate
+from . import make_account
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('pager', password='pw')
+        self.account = make_account(self.user, '1400')
+        Transaction.objects.bulk_create([
+            Transaction(account=self.account, transaction_type='deposit', amount=Decimal(amount)) for amount in range(1, 8)
+        ])
+        # Every row on the same instant, so only the id orders them
+        Transaction.objects.update(timestamp=timezone.now())
+        self.queryset = Transaction.objects.filter(account=self.account)
+
+    def test_pages_cover_rows_with_equal_timestamps(self):
+        newest_first = list(self.queryset.order_by('-timestamp', '-pk').values_list('pk', flat=True))
+        pages, page = [], paginate(self.queryset, page_size=3)
+        while True:
+            pages.append([row.pk for row in page])
+            if not page.has_next:
+                break
+            page = paginate(self.queryset, after=page.next_cursor, page_size=3)
+        self.assertEqual(pages, [newest_first[:3], newest_first[3:6], newest_first[6:]])
+
+        backwards = []
+        while page.has_previous:
+            page = paginate(self.queryset, before=page.previous_cursor, page_size=3)
+            backwards.append([row.pk for row in page])
+        self.assertEqual(backwards, [newest_first[3:6], newest_first[:3]])
+
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        timestamp = timezone.now()
+        for cursor in ('', 'not-base64!', encode_cursor(timestamp, 'x'), encode_cursor(timestamp, 0), encode_cursor(timestamp, MAX_PK + 1)):
+            self.assertIsNone(decode_cursor(cursor), cursor)
+        self.assertEqual(decode_cursor(encode_cursor(datetime(2024, 1, 2), MAX_PK)), (datetime(2024, 1, 2), MAX_PK))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transaction_history', args=[self.account.pk]), {'after': encode_cursor(timestamp, 10 ** 30)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['transactions']), 7)
+
+    @override_settings(TRANSACTION_PAGE_SIZE=20, TRANSACTION_MAX_PAGE_SIZE=100)
+    def test_page_size_is_capped(self):
+        self.assertEqual([page_size_from(value) for value in (None, 'abc', '0', '-5', '30', '100000')], [20, 20, 1, 1, 30, 100])
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from ..profiling import ProfilingMiddleware
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def test_runs_natively_in_async_and_sync_chains(self):
+        async def async_view(request):
+            pass
+
+        with override_settings(PROFILING_TOKEN='secret'):
+            self.assertTrue(iscoroutinefunction(ProfilingMiddleware(async_view)))
+            self.assertFalse(iscoroutinefunction(ProfilingMiddleware(lambda request: None)))
+
+    async def test_profiles_a_requested_asgi_request(self):
+        user = await sync_to_async(User.objects.create_user)('profiled', password='pw')
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=directory):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            response = await client.get(reverse('loan_status'), headers={'X-Profile': 'secret'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(os.path.exists(os.path.join(directory, response['X-Profile-File'])))
+            response = await client.get(reverse('loan_status'), headers={'X-Profile': 'wrong'})
+            self.assertNotIn('X-Profile-File', response)
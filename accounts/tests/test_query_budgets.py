@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import URLPattern, get_resolver
+
+from .. import authcache, ledger
+from ..models import Loan
+from ..testing import QueryBudgetMixin
+from . import make_account
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        authcache.users.clear()
+        self.user = User.objects.create_user('budget', password='pw', is_staff=True)
+        self.account = make_account(self.user, '1200', '500.00')
+        self.payee = make_account(User.objects.create_user('payee', password='pw'), '1300')
+        self.loan = Loan.objects.create(user=self.user, account=self.account, amount=Decimal('100.00'), interest_rate=Decimal('5.00'))
+        ledger.approve_loans(Loan.objects.filter(pk=self.loan.pk))
+        ledger.deposit(self.account, Decimal('10.00'), 'salary')
+        ledger.repay_loan(Loan.objects.get(pk=self.loan.pk), Decimal('5.00'))
+        self.requested = set()
+
+    def assertQueryBudget(self, url_name, *args, **kwargs):
+        # Budgets hold with a cold per-process user cache
+        authcache.users.clear()
+        self.requested.add(url_name)
+        return super().assertQueryBudget(url_name, *args, **kwargs)
+
+    def test_every_view_declares_a_budget(self):
+        self.assertAllViewsBudgeted()
+
+    def test_every_view_stays_within_its_budget(self):
+        account, loan = [self.account.pk], [self.loan.pk]
+        anonymous = self.client_class()
+        self.assertQueryBudget('signup', client=anonymous)
+        self.assertEqual(self.assertQueryBudget('signup', client=anonymous, method='post', data={'username': 'new', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!'}).status_code, 302)
+        anonymous = self.client_class()
+        self.assertQueryBudget('login', client=anonymous)
+        self.assertQueryBudget('login', client=anonymous, method='post', data={'username': 'budget', 'password': 'wrong'})
+        self.assertEqual(self.assertQueryBudget('login', client=anonymous, method='post', data={'username': 'budget', 'password': 'pw'}).status_code, 302)
+
+        self.client.force_login(self.user)
+        self.assertQueryBudget('home')
+        self.assertQueryBudget('home', method='post', data={'account': self.account.pk})
+        self.assertQueryBudget('view_account')
+        self.assertQueryBudget('create_account')
+        self.assertEqual(self.assertQueryBudget('create_account', method='post', data={'account_type': 'savings'}).status_code, 302)
+        self.assertQueryBudget('deposit')
+        self.assertEqual(self.assertQueryBudget('deposit', method='post', data={'account': self.account.pk, 'amount': '5.00', 'description': ''}).status_code, 302)
+        self.assertQueryBudget('withdraw')
+        self.assertEqual(self.assertQueryBudget('withdraw', method='post', data={'account': self.account.pk, 'amount': '1.00', 'description': ''}).status_code, 302)
+        self.assertQueryBudget('transfer', args=account)
+        self.assertEqual(self.assertQueryBudget('transfer', args=account, method='post', data={'amount': '1.00', 'to_account': self.payee.account_number}).status_code, 302)
+        self.assertQueryBudget('transaction_history', args=account)
+        self.assertQueryBudget('account_details', args=account)
+        self.assertQueryBudget('statement_export', args=account)
+        self.assertQueryBudget('apply_for_loan')
+        self.assertEqual(self.assertQueryBudget('apply_for_loan', method='post', data={'amount': '50.00', 'interest_rate': '5.00', 'duration_months': 12}).status_code, 302)
+        self.assertQueryBudget('loan_status')
+        self.assertQueryBudget('loan_details', args=loan)
+        self.assertQueryBudget('repay_loan', args=loan)
+        self.assertEqual(self.assertQueryBudget('repay_loan', args=loan, method='post', data={'amount': '1.00'}).status_code, 302)
+        self.assertQueryBudget('metrics')
+        self.assertEqual(self.assertQueryBudget('logout', method='post').status_code, 302)
+
+        named = {pattern.name for pattern in get_resolver('accounts.urls').url_patterns if isinstance(pattern, URLPattern)}
+        self.assertEqual(named - self.requested, set())
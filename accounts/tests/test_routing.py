@@ -0,0 +1,98 @@
+import contextvars
+import copy
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import ledger, routing
+from ..models import Account, Transaction
+from . import make_account
+
+REPLICA = 'test_replica'
+
+# A second database standing in for the replica, set up by the test runner like any other alias. Only
+# the tests below route to it (REPLICA_DATABASE), and it holds just the rows they copy into it.
+if REPLICA not in connections.settings:
+    replica = copy.deepcopy(connections.settings['default'])
+    replica['NAME'] = f"{replica['NAME']}_replica"
+    replica['TEST'] = {**replica['TEST'], 'NAME': None, 'MIRROR': None}
+    connections.settings[REPLICA] = replica
+
+
+def replicate(*instances):
+    for instance in instances:
+        type(instance).objects.using(REPLICA).bulk_create([copy.copy(instance)])
+
+
+@override_settings(REPLICA_DATABASE=REPLICA)
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        self.user = User.objects.create_user('replicated', password='pw', is_staff=True, is_superuser=True)
+        self.account = make_account(self.user, '1600', '10.00')
+        # The replica lags: it has the account, but with an older balance
+        replicate(self.user, Account(pk=self.account.pk, user_id=self.user.pk, account_number='1600', account_type='savings', balance=Decimal('7.00')))
+        self.client.force_login(self.user)
+
+    def shown_balance(self):
+        response = self.client.get(reverse('transaction_history', args=[self.account.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.context['account'].balance
+
+    def test_read_only_views_read_from_the_replica(self):
+        self.assertEqual(self.shown_balance(), Decimal('7.00'))
+        self.assertNotIn(routing.COOKIE_NAME, self.client.cookies)
+        # Other views, and any non-GET, stay on the primary
+        self.assertEqual(self.client.get(reverse('view_account')).context['accounts'][0].balance, Decimal('10.00'))
+
+    def test_a_write_pins_the_rest_of_the_request_to_the_primary(self):
+        seen = []
+
+        @routing.read_only_view
+        def view(request):
+            seen.append(Account.objects.get(pk=self.account.pk).balance)
+            ledger.deposit(self.account, Decimal('1.00'))
+            seen.append(Account.objects.get(pk=self.account.pk).balance)
+
+        # A fresh context, as ReplicaRoutingMiddleware gives each request
+        contextvars.Context().run(view, RequestFactory().get('/'))
+        self.assertEqual(seen, [Decimal('7.00'), Decimal('11.00')])
+
+    def test_the_sticky_cookie_is_set_after_a_write_and_honoured(self):
+        response = self.client.post(reverse('deposit'), {'account': self.account.pk, 'amount': '5.00', 'description': ''})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(routing.COOKIE_NAME, response.cookies)
+        self.assertEqual(self.shown_balance(), Decimal('15.00'))
+        del self.client.cookies[routing.COOKIE_NAME]
+        self.assertEqual(self.shown_balance(), Decimal('7.00'))
+
+    def test_asking_where_to_write_does_not_pin(self):
+        # The delete confirmation page looks up related rows on the database it would delete from
+        response = self.client.get(reverse('admin:accounts_account_delete', args=[self.account.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(routing.COOKIE_NAME, response.cookies)
+
+    def test_streamed_bodies_read_from_the_replica_after_the_view_returned(self):
+        replicate(Transaction(pk=10 ** 6, account_id=self.account.pk, transaction_type='deposit', amount=Decimal('7.00'), signed_amount=Decimal('7.00'), description='replicated'))
+        response = self.client.get(reverse('statement_export', args=[self.account.pk]))
+        self.assertFalse(routing._replica_reads.get())
+        self.assertIn(b'replicated', b''.join(response.streaming_content))
+
+    def test_the_stream_wrapper_restores_the_routing_flags(self):
+        seen = []
+
+        def chunks():
+            seen.append((routing._replica_reads.get(), routing._wrote.get()))
+            yield b'row'
+
+        token = routing._wrote.set(True)
+        try:
+            self.assertEqual(list(routing.replica_stream(chunks(), wrote=False)), [b'row'])
+            self.assertEqual((routing._replica_reads.get(), routing._wrote.get()), (False, True))
+        finally:
+            routing._wrote.reset(token)
+        self.assertEqual(seen, [(True, False)])
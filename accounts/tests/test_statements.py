@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import ledger, statements
+from . import make_account
+
+
+class StatementExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('statement', password='pw')
+        self.account = make_account(self.user, '1000')
+        for amount in range(1, 8):
+            ledger.deposit(self.account, Decimal(amount), f"deposit {amount}")
+        self.url = reverse('statement_export', args=[self.account.pk])
+
+    async def test_asgi_export_streams_from_an_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        for fmt, header in (('csv', b'id,timestamp'), ('ndjson', b'{"id": ')):
+            response = await self.async_client.get(self.url, {'format': fmt})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            self.assertTrue(body.startswith(header))
+            self.assertEqual(body.count(b'deposit '), 7)
+
+    async def test_async_rows_match_the_sync_rows_across_chunks(self):
+        expected = await sync_to_async(lambda: list(statements.statement_rows(self.account)))()
+        rows = [row async for row in statements.astatement_rows(self.account, chunk_size=3)]
+        self.assertEqual(rows, expected)
+        self.assertEqual(len(rows), 7)
+
+    def test_wsgi_export_streams_from_a_sync_iterator(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).count(b'deposit '), 7)
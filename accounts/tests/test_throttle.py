@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import forms as auth_forms
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import throttle
+
+
+@override_settings(LOGIN_THROTTLE={'username': (3, 60), 'ip': (5, 60)})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        User.objects.create_user('alice', password='pw')
+        self.url = reverse('login')
+
+    def login(self, username='alice', password='wrong', ip='10.0.0.1'):
+        return self.client_class().post(self.url, {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_username_window_answers_429_after_the_limit(self):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.login(ip=ip).status_code, 200)
+        response = self.login(ip='10.0.0.4')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 61)
+        self.assertEqual(self.login(username='ALICE ', ip='10.0.0.5').status_code, 429)
+        self.assertEqual(self.login(username='bob', ip='10.0.0.6').status_code, 200)
+
+    def test_ip_window_answers_429_after_the_limit(self):
+        for index in range(5):
+            self.assertEqual(self.login(username=f'user{index}').status_code, 200)
+        response = self.login(username='someone-else')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.login(username='someone-else', ip='10.0.0.2').status_code, 200)
+
+    def test_shed_attempts_never_reach_the_password_hasher(self):
+        for _ in range(3):
+            self.login()
+        with mock.patch.object(auth_forms, 'authenticate', wraps=auth_forms.authenticate) as authenticate, \
+                mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check_password:
+            self.assertEqual(self.login(password='pw').status_code, 429)
+        authenticate.assert_not_called()
+        check_password.assert_not_called()
+
+    def test_a_successful_login_checks_the_password_once_and_resets_the_username(self):
+        self.login()
+        self.login()
+        with mock.patch('django.contrib.auth.base_user.check_password', wraps=hashers.check_password) as check_password:
+            self.assertRedirects(self.login(password='pw'), reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(check_password.call_count, 1)
+        for _ in range(3):
+            self.assertEqual(self.login(ip='10.0.0.2').status_code, 200)
+        self.assertEqual(self.login(ip='10.0.0.3').status_code, 429)
+
+    def test_reset_clears_the_username_window(self):
+        for _ in range(3):
+            self.login()
+        throttle.reset('Alice')
+        self.assertEqual(self.login(ip='10.0.0.2').status_code, 200)
+
+
+class SlidingWindowTests(TestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+
+    def hit(self, now):
+        return throttle._hit(self.cache, 'username', 'carol', 10, 100, now)
+
+    def test_previous_bucket_counts_by_the_share_still_in_the_window(self):
+        for _ in range(10):
+            self.assertEqual(self.hit(50), 0)
+        self.assertEqual(self.hit(99), 1)
+        # Halfway into the next bucket half of the previous ten still count
+        for _ in range(5):
+            self.assertEqual(self.hit(150), 0)
+        self.assertEqual(self.hit(150), 10)
+        self.assertEqual(self.hit(160), 0)
+        self.assertEqual(self.hit(160), 10)
+
+    def test_turned_away_attempts_are_not_counted(self):
+        for _ in range(10):
+            self.hit(10)
+        for _ in range(50):
+            self.assertEqual(self.hit(20), 80)
+        self.assertEqual(self.cache.get(throttle._key('username', 'carol', 0)), 10)
+        # The next window weighs only the ten that were let through
+        self.assertEqual(self.hit(190), 0)
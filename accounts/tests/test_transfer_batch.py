@@ -0,0 +1,50 @@
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Account
+from . import make_account
+
+
+class TransferBatchCommandTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('batch', password='pw')
+        self.source = make_account(user, '500', '100.00')
+        self.payee = make_account(user, '600')
+
+    def run_batch(self, suffix, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path, report = os.path.join(directory, f'items{suffix}'), os.path.join(directory, 'report.csv')
+            with open(path, 'w') as handle:
+                handle.write(content)
+            call_command('transfer_batch', self.source.account_number, path, report=report, stdout=io.StringIO(), stderr=io.StringIO())
+            with open(report) as handle:
+                return [line.rstrip('\r\n').split(',', 4) for line in handle][1:]
+
+    def test_bad_lines_and_sub_cent_amounts_fail_per_item(self):
+        rows = self.run_batch('.ndjson', '\n'.join([
+            '{"to_account": "600", "amount": "10.005"}',
+            '{"to_account": "600", "amount": "2.50"}',
+            '{"to_account": "600", "amount": ',
+            '[1, 2]',
+            '{"to_account": "600", "amount": "abc"}',
+            '{"to_account": "600", "amount": "1.00"}',
+        ]))
+        self.assertEqual([(index, status) for index, _, _, status, _ in rows], [
+            ('0', 'failed'), ('1', 'ok'), ('2', 'failed'), ('3', 'failed'), ('4', 'failed'), ('5', 'ok'),
+        ])
+        self.assertEqual(rows[0][4], "Amount has more than two decimal places.")
+        self.assertTrue(rows[2][4].startswith("Line 3 is not valid JSON"))
+        self.assertEqual(rows[3][4], "Line 4 is not a JSON object")
+        self.assertEqual(Account.objects.get(pk=self.payee.pk).balance, Decimal('3.50'))
+        self.assertEqual(Account.objects.get(pk=self.source.pk).balance, Decimal('96.50'))
+
+    def test_csv_amounts_are_not_rounded(self):
+        rows = self.run_batch('.csv', 'to_account,amount\n600,0.015\n600,0.01\n')
+        self.assertEqual([status for _, _, _, status, _ in rows], ['failed', 'ok'])
+        self.assertEqual(Account.objects.get(pk=self.payee.pk).balance, Decimal('0.01'))
@@ -0,0 +1,105 @@
+"""Login throttling that turns attempts away before any password hashing.
+
+Every login attempt counts against two sliding windows kept in the Django
+cache: one for the username and one for the client IP. A window is
+approximated from two fixed buckets, as ``current + previous * (share of
+the previous bucket still inside the window)``. Each check therefore costs
+one ``get_many`` per key, plus an ``incr`` when the attempt is let through,
+and never a scan. Once either window is full, the attempt is answered with
+429 and ``Retry-After`` without touching the password hasher, so a
+credential-stuffing burst costs cache round trips instead of PBKDF2
+iterations on every worker. Attempts turned away are not counted: a flood
+against one username cannot keep it locked, because the window opens again
+once the attempts it let through slide out.
+
+A successful login clears its username's window. ``LOGIN_THROTTLE`` holds
+``(limit, window seconds)`` per scope; set a scope to None to turn it off.
+Run behind a proxy only if it sets ``REMOTE_ADDR`` to the client address.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_LIMITS = {
+    'username': (5, 300),
+    'ip': (20, 300),
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')]
+
+
+def limits():
+    return {**DEFAULT_LIMITS, **getattr(settings, 'LOGIN_THROTTLE', {})}
+
+
+def _key(scope, value, bucket):
+    # Hashed so any username is a valid cache key
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f"login-throttle:{scope}:{digest}:{bucket}"
+
+
+def _retry_after(current, previous, limit, window, offset):
+    """Seconds until ``current`` plus the sliding share of ``previous`` fits in ``limit``."""
+    if current > limit:
+        return window - offset
+    # Over only because of the previous bucket: wait until enough of it has slid out
+    return max(1, (1 - (limit - current) / previous) * window - offset)
+
+
+def _hit(cache, scope, value, limit, window, now):
+    """Count one attempt; return the seconds until the window allows another, or 0."""
+    bucket, offset = divmod(now, window)
+    bucket = int(bucket)
+    current_key, previous_key = _key(scope, value, bucket), _key(scope, value, bucket - 1)
+    counts = cache.get_many([current_key, previous_key])
+    current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+    weight = 1 - offset / window
+    if current + 1 + previous * weight > limit:
+        return _retry_after(current + 1, previous, limit, window, offset)
+    cache.add(current_key, 0, window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(current_key, 1, window * 2)
+        current = 1
+    if current + previous * weight <= limit:
+        return 0
+    # Concurrent attempts took the last places: give this one back
+    cache.decr(current_key)
+    return _retry_after(current, previous, limit, window, offset)
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR') or 'unknown'
+
+
+def normalize(username):
+    return (username or '').strip().lower()
+
+
+def check(request, username):
+    """Count a login attempt; return (scope, retry-after seconds) when it must be turned away."""
+    cache = get_cache()
+    now = time.time()
+    for scope, value in (('ip', client_ip(request)), ('username', normalize(username))):
+        rule = limits().get(scope)
+        if rule is None or not value:
+            continue
+        retry_after = _hit(cache, scope, value, *rule, now)
+        if retry_after:
+            return scope, int(retry_after) + 1
+    return None
+
+
+def reset(username):
+    """Forget a username's attempts after it logged in."""
+    rule = limits().get('username')
+    if rule is None:
+        return
+    bucket = int(time.time() // rule[1])
+    get_cache().delete_many([_key('username', normalize(username), bucket - offset) for offset in (0, 1)])
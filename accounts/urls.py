@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 from django.contrib.auth import views as auth_views
 
+# Under ASGI the read-heavy pages are served by their async versions (see async_views.py)
+reads = async_views if getattr(settings, 'ASYNC_VIEWS', False) else views
+
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', reads.home, name='home'),
     path('signup/', views.signup, name='signup'),
     path('login/', views.user_login, name='login'), 
     path('logout/', views.user_logout, name='logout'),
@@ -12,10 +16,12 @@ urlpatterns = [
     path('deposit/', views.deposit, name='deposit'),
     path('withdraw/', views.withdraw, name='withdraw'),
     path('transfer/<int:account_id>/', views.transfer, name='transfer'),
-    path('transaction-history/<int:account_id>/', views.transaction_history, name='transaction_history'),
+    path('transaction-history/<int:account_id>/', reads.transaction_history, name='transaction_history'),
     path('apply-for-loan/', views.apply_for_loan, name='apply_for_loan'),
-    path('loan-status/', views.loan_status, name='loan_status'),
+    path('loan-status/', reads.loan_status, name='loan_status'),
     path('repay-loan/<int:loan_id>/', views.repay_loan, name='repay_loan'),
-    path('loan-details/<int:loan_id>/', views.loan_details, name='loan_details'),
-    path('account-details/<int:account_id>/', views.account_details, name='account_details'),
+    path('loan-details/<int:loan_id>/', reads.loan_details, name='loan_details'),
+    path('account-details/<int:account_id>/', reads.account_details, name='account_details'),
+    path('statement/<int:account_id>/', views.statement_export, name='statement_export'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
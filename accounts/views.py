@@ -1,11 +1,22 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth import login, authenticate, logout, views as auth_views
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import login, logout, views as auth_views
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
+from django.core.handlers.asgi import ASGIRequest
 from .models import Account, Transaction, Loan
-from .forms import SignUpForm, AccountForm, DepositForm, WithdrawalForm, TransferForm, LoanApplicationForm
+from .forms import SignUpForm, OpenAccountForm, DepositForm, WithdrawalForm, TransferForm, LoanApplicationForm
+from .pagination import paginate_request
+from . import dashboard, ledger, metrics, statements, throttle
+from .numbering import save_with_account_number
+from .queries import query_budget
+from .routing import read_only_view
 from decimal import Decimal
+import time
 
+@query_budget(11)
 def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -17,23 +28,39 @@ def signup(request):
         form = UserCreationForm()
     return render(request, 'accounts/signup.html', {'form': form})
 
+@query_budget(9)
 def user_login(request):
     if request.user.is_authenticated:
         return redirect('home')  # Redirect to home if already logged in
 
     if request.method == 'POST':
+        started = time.thread_time()
         form = AuthenticationForm(request, data=request.POST)
-        if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                return redirect('home')  # Redirect to home after login
+        # Over-limit attempts are turned away before the password is hashed
+        shed = throttle.check(request, request.POST.get('username'))
+        if shed is not None:
+            scope, retry_after = shed
+            outcome = f'shed_{scope}'
+            response = render(request, 'accounts/login.html', {'form': form, 'throttled': True}, status=429)
+            response['Retry-After'] = str(retry_after)
+        elif form.is_valid():
+            # is_valid() already authenticated the user; one password check per attempt
+            outcome = 'success'
+            user = form.get_user()
+            login(request, user)
+            throttle.reset(user.get_username())
+            response = redirect('home')  # Redirect to home after login
+        else:
+            outcome = 'failure'
+            response = render(request, 'accounts/login.html', {'form': form})
+        metrics.login_attempts.inc(outcome)
+        metrics.login_cpu.observe(outcome, value=time.thread_time() - started)
+        return response
     else:
         form = AuthenticationForm()
     return render(request, 'accounts/login.html', {'form': form})
 
+@query_budget(4)
 def user_logout(request):
     logout(request)
     return redirect('login') 
@@ -45,23 +72,12 @@ def root_redirect(request):
     else:
         return redirect('login')
 
-def create_account(request):
-    if request.method == 'POST':
-        form = AccountForm(request.POST)
-        if form.is_valid():
-            account = form.save(commit=False)
-            account.user = request.user
-            account.account_number = f"{request.user.id}{Account.objects.count() + 1}"  # Simple account number generation
-            account.save()
-            return redirect('view_account')
-    else:
-        form = AccountForm()
-    return render(request, 'accounts/create_account.html', {'form': form})
-
+@query_budget(3)
 def view_account(request):
     accounts = Account.objects.filter(user=request.user)
     return render(request, 'accounts/view_account.html', {'accounts': accounts})
 
+@query_budget(7)
 @login_required
 def deposit(request):
     if request.method == 'POST':
@@ -72,23 +88,18 @@ def deposit(request):
             amount = form.cleaned_data['amount']
             description = form.cleaned_data['description']
 
-            account.balance += amount
-            account.save()
-
-            Transaction.objects.create(
-                account=account,
-                transaction_type='deposit',
-                amount=amount,
-                description=description
-            )
-
-            return redirect('home')
+            try:
+                ledger.deposit(account, amount, description)
+                return redirect('home')
+            except ledger.LedgerError as e:
+                form.add_error('amount', str(e))
     else:
         form = DepositForm()
 
     accounts = Account.objects.filter(user=request.user)  # Show only the logged-in user's accounts
     return render(request, 'accounts/deposit.html', {'form': form, 'accounts': accounts})
 
+@query_budget(7)
 @login_required
 def withdraw(request):
     if request.method == 'POST':
@@ -99,28 +110,21 @@ def withdraw(request):
             amount = form.cleaned_data['amount']
             description = form.cleaned_data['description']
 
-            if account.balance >= amount:
-                account.balance -= amount
-                account.save()
-
-                Transaction.objects.create(
-                    account=account,
-                    transaction_type='withdrawal',
-                    amount=amount,
-                    description=description
-                )
-
+            try:
+                ledger.withdraw(account, amount, description)
                 return redirect('home')
-            else:
-                form.add_error('amount', 'Insufficient balance')
+            except ledger.LedgerError as e:
+                form.add_error('amount', str(e))
     else:
         form = WithdrawalForm()
 
     accounts = Account.objects.filter(user=request.user)  # Show only the logged-in user's accounts
     return render(request, 'accounts/withdraw.html', {'form': form, 'accounts': accounts})
 
+@query_budget(10)
+@login_required
 def transfer(request, account_id):
-    account = Account.objects.get(id=account_id)
+    account = get_object_or_404(Account, id=account_id, user=request.user)  # Only the owner can move money out
     if request.method == 'POST':
         form = TransferForm(request.POST)
         if form.is_valid():
@@ -128,27 +132,27 @@ def transfer(request, account_id):
             to_account_number = form.cleaned_data['to_account']
             try:
                 to_account = Account.objects.get(account_number=to_account_number)
-                if account.balance >= amount:
-                    account.balance -= amount
-                    to_account.balance += amount
-                    account.save()
-                    to_account.save()
-                    Transaction.objects.create(account=account, transaction_type='transfer', amount=amount, description=f"Transferred to {to_account_number}")
-                    Transaction.objects.create(account=to_account, transaction_type='transfer', amount=amount, description=f"Received from {account.account_number}")
-                    return redirect('view_account')
-                else:
-                    form.add_error('amount', 'Insufficient balance')
+                ledger.transfer(account, to_account, amount)
+                return redirect('view_account')
+            except ledger.SameAccountTransfer as e:
+                form.add_error('to_account', str(e))
+            except ledger.LedgerError as e:
+                form.add_error('amount', str(e))
             except Account.DoesNotExist:
                 form.add_error('to_account', 'Account does not exist')
     else:
         form = TransferForm()
     return render(request, 'accounts/transfer.html', {'form': form, 'account': account})
 
+@query_budget(4)
+@read_only_view
+@login_required
 def transaction_history(request, account_id):
-    account = Account.objects.get(id=account_id)
-    transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
+    account = get_object_or_404(Account, id=account_id, user=request.user)
+    transactions = paginate_request(request, Transaction.objects.with_archive().filter(account=account))
     return render(request, 'accounts/transaction_history.html', {'transactions': transactions, 'account': account})
 
+@query_budget(3)
 @login_required
 def apply_for_loan(request):
     if request.method == 'POST':
@@ -163,12 +167,15 @@ def apply_for_loan(request):
     return render(request, 'accounts/apply_for_loan.html', {'form': form})
 
 # View loan status
+@query_budget(3)
+@read_only_view
 @login_required
 def loan_status(request):
     loans = Loan.objects.filter(user=request.user)
     return render(request, 'accounts/loan_status.html', {'loans': loans})
 
 #repay loan
+@query_budget(11)
 @login_required
 def repay_loan(request, loan_id):
     loan = get_object_or_404(Loan, id=loan_id, user=request.user)
@@ -185,32 +192,18 @@ def repay_loan(request, loan_id):
         if amount > loan.total_amount:
             return render(request, 'accounts/repay_loan.html', {'loan': loan, 'error': 'Amount cannot exceed the total loan amount.'})
 
-        # Deduct the repaid amount from the loan total amount
-        loan.total_amount -= amount
-        loan.save()
-
-        # Deduct the repaid amount from the user's account balance
-        account = loan.account
-        account.balance -= amount
-        account.save()
-
-        # Record the repayment transaction
-        Transaction.objects.create(
-            account=account,
-            transaction_type='repayment',
-            amount=amount,
-            description=f"Repayment for Loan #{loan.id}"
-        )
-
-        # Mark the loan as repaid if the total amount is fully repaid
-        if loan.total_amount <= Decimal('0.00'):
-            loan.status = 'repaid'
-            loan.save()
+        # Debit the account, reduce the loan total and mark it repaid when settled
+        try:
+            ledger.repay_loan(loan, amount)
+        except ledger.LedgerError as e:
+            return render(request, 'accounts/repay_loan.html', {'loan': loan, 'error': str(e)})
 
         return redirect('loan_status')
 
     return render(request, 'accounts/repay_loan.html', {'loan': loan})
 
+@query_budget(4)
+@read_only_view
 @login_required
 def loan_details(request, loan_id):
     loan = get_object_or_404(Loan, id=loan_id, user=request.user)
@@ -219,11 +212,7 @@ def loan_details(request, loan_id):
     monthly_interest = (loan.amount * loan.interest_rate / 100) / 12
 
     # Get all repayment transactions for this loan
-    repayments = Transaction.objects.filter(
-        account=loan.account,
-        transaction_type='repayment',
-        description__icontains=f"Repayment for Loan #{loan.id}"
-    ).order_by('timestamp')
+    repayments = Transaction.objects.with_archive().filter(loan=loan, transaction_type='repayment').order_by('timestamp')
 
     context = {
         'loan': loan,
@@ -233,25 +222,29 @@ def loan_details(request, loan_id):
 
     return render(request, 'accounts/loan_details.html', context)
 
+# The first account opened in a process also reserves a block of numbers
+@query_budget(14)
 @login_required
 def create_account(request):
     if request.method == 'POST':
-        form = AccountForm(request.POST)
+        form = OpenAccountForm(request.POST)
         if form.is_valid():
             account = form.save(commit=False)
             account.user = request.user  # Link the account to the logged-in user
-            account.save()
+            save_with_account_number(account)  # Allocated 14-digit number with check digit
             return redirect('home')  # Redirect to home after creating the account
     else:
-        form = AccountForm()
+        form = OpenAccountForm()
     return render(request, 'accounts/create_account.html', {'form': form})
 
+@query_budget(5)
+@read_only_view
 @login_required
 def account_details(request, account_id):
     account = get_object_or_404(Account, id=account_id, user=request.user)
 
-    # Get all transactions for this account
-    transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
+    # Get one page of transactions for this account
+    transactions = paginate_request(request, Transaction.objects.with_archive().filter(account=account))
 
     # Get active loans for this account
     active_loans = Loan.objects.filter(account=account, status='approved')
@@ -264,32 +257,71 @@ def account_details(request, account_id):
 
     return render(request, 'accounts/account_details.html', context)
 
+@query_budget(4)
+@read_only_view
 @login_required
-def home(request):
-    accounts = Account.objects.filter(user=request.user)
-    selected_account = accounts.first()  # Default to the first account
+def statement_export(request, account_id):
+    account = get_object_or_404(Account, id=account_id, user=request.user)
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in statements.FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    try:
+        start_date = parse_date(request.GET['from']) if request.GET.get('from') else None
+        end_date = parse_date(request.GET['to']) if request.GET.get('to') else None
+    except ValueError:
+        start_date = end_date = None
+    if (request.GET.get('from') and start_date is None) or (request.GET.get('to') and end_date is None):
+        return HttpResponseBadRequest("from/to must be dates (YYYY-MM-DD)")
+
+    if isinstance(request, ASGIRequest):
+        # Django drains a sync iterator into memory before sending it over ASGI
+        body = statements.aencode(statements.astatement_rows(account, start_date, end_date), fmt)
+    else:
+        body = statements.encode(statements.statement_rows(account, start_date, end_date), fmt)
+    response = StreamingHttpResponse(body, content_type=statements.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="statement-{account.account_number}.{fmt}"'
+    return response
+
+# Prometheus scrape endpoint for this process (see metrics.py)
+@query_budget(2)
+@staff_member_required
+def metrics_view(request):
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def home_context(request, dashboard_data):
+    # Accounts, last 3 transactions and pending loans come from the per-user cache
+    accounts = dashboard_data['accounts']
+    selected_account = accounts[0] if accounts else None  # Default to the first account
 
     if request.method == 'POST':
         # Handle account selection from the dropdown
         account_id = request.POST.get('account')
-        selected_account = get_object_or_404(Account, id=account_id, user=request.user)
+        selected_account = next((account for account in accounts if str(account.id) == account_id), None)
+        if selected_account is None:
+            raise Http404("No Account matches the given query.")
 
-    transactions = Transaction.objects.filter(account__user=request.user).order_by('-timestamp')[:3]  # Last 3 transactions
-    pending_loans = Loan.objects.filter(user=request.user, status='pending')  # Get pending loans
+    transactions = dashboard_data['transactions']  # Last 3 transactions
+    pending_loans = dashboard_data['pending_loans']  # Get pending loans
 
     # Handle case when no accounts exist
     if not selected_account:
-        return render(request, 'accounts/home.html', {
+        return {
             'accounts': accounts,
             'transactions': transactions,
             'pending_loans': pending_loans,
             'no_accounts': True,  # Add a flag to indicate no accounts
-        })
+        }
 
-    return render(request, 'accounts/home.html', {
+    return {
         'accounts': accounts,
         'transactions': transactions,
         'selected_account': selected_account,
         'pending_loans': pending_loans,
         'no_accounts': False,  # Add a flag to indicate accounts exist
-    })
\ No newline at end of file
+    }
+
+@query_budget(5)
+@login_required
+def home(request):
+    return render(request, 'accounts/home.html', home_context(request, dashboard.get_dashboard(request.user)))
@@ -13,6 +13,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -45,11 +46,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so a profiled request includes all other middleware (see accounts/profiling.py)
+    'accounts.profiling.ProfilingMiddleware',
+    # Request latency, query counts and DB time per URL name (see accounts/metrics.py)
+    'accounts.metrics.MetricsMiddleware',
+    # Before the session and auth middleware, so their queries are counted too (see accounts/middleware.py)
+    'accounts.middleware.QueryCountMiddleware',
+    # Keeps a user's reads on the primary right after their writes (see accounts/routing.py)
+    'accounts.routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Django's AuthenticationMiddleware with a short-lived per-process user cache (see accounts/authcache.py)
+    'accounts.authcache.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,16 +83,75 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'bankmanagementsystem.wsgi.application'
+ASGI_APPLICATION = 'bankmanagementsystem.asgi.application'
+# asgi.py turns this on to serve the read-heavy pages from accounts/async_views.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS') == '1'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# Database profile from the environment. DB_ENGINE=postgres for production,
+# anything else for SQLite (development, single host).
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # Needs psycopg 3 (pip install "psycopg[binary,pool]")
+    def postgres_database(host):
+        database = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'bank'),
+            'USER': os.getenv('DB_USER', 'bank'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': host,
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Reuse connections across requests; check them before reuse after errors
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+        if os.getenv('DB_POOL') == '1':
+            # psycopg's pool manages connection lifetime itself, so persistent connections are off
+            database['CONN_MAX_AGE'] = 0
+            database['OPTIONS']['pool'] = {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+            }
+        return database
+
+    DATABASES = {'default': postgres_database(os.getenv('DB_HOST', 'localhost'))}
+    if os.getenv('DB_REPLICA_HOST'):
+        DATABASES['replica'] = postgres_database(os.getenv('DB_REPLICA_HOST'))
+else:
+    def sqlite_database(path):
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        if os.getenv('SQLITE_TUNED', '1') == '1':
+            database['OPTIONS'] = {
+                # Take the write lock at BEGIN, so a reader never fails to upgrade mid-transaction
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+                # Run on every new connection: WAL lets readers run alongside the writer,
+                # and synchronous=NORMAL is safe under WAL with far fewer fsyncs
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            }
+        return database
+
+    DATABASES = {'default': sqlite_database(os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')))}
+    # Optional read replica for @read_only_view pages and admin changelists (see accounts/routing.py)
+    if os.getenv('REPLICA_SQLITE_PATH'):
+        DATABASES['replica'] = sqlite_database(os.getenv('REPLICA_SQLITE_PATH'))
+
+DATABASE_ROUTERS = ['accounts.routing.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+# How long a user's reads stay on the primary after they write
+REPLICA_STICKY_SECONDS = 10
 
 
 # Password validation
@@ -103,6 +172,50 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory by default (and in tests); point CACHE_BACKEND/CACHE_LOCATION at
+# e.g. django.core.cache.backends.redis.RedisCache in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Sessions: db (default), cached_db or signed_cookies. cached_db reads through
+# the 'sessions' cache below; with more than one process it must be a shared
+# cache (SESSION_CACHE_BACKEND), since a local-memory copy outlives a logout
+# elsewhere. signed_cookies needs no queries, but a copied cookie stays
+# valid until it expires, whatever the server does.
+SESSION_MODE = os.getenv('SESSION_MODE', 'db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f"SESSION_MODE must be one of {', '.join(SESSION_ENGINES)}, not {SESSION_MODE!r}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+CACHES['sessions'] = {
+    'BACKEND': os.getenv('SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+    'LOCATION': os.getenv('SESSION_CACHE_LOCATION', 'sessions'),
+}
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Seconds each process reuses a loaded authenticated user (see accounts/authcache.py); 0 turns it off
+AUTH_USER_CACHE_SECONDS = float(os.getenv('AUTH_USER_CACHE_SECONDS', '5'))
+
+# Login attempts allowed as (limit, window seconds) per username and per client IP
+# before further attempts get 429 without any password hashing (see accounts/throttle.py).
+# The counts live in the default cache, which must be shared between processes in production.
+LOGIN_THROTTLE = {'username': (5, 300), 'ip': (20, 300)}
+
+# Per-user home dashboard cache (see accounts/dashboard.py)
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TIMEOUT = 300
+
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -114,6 +227,62 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'accounts.tasks.calculate_interest',
         'schedule': crontab(hour=0, minute=0),  # Run daily at midnight
     },
+    'roll-balance-checkpoints-hourly': {
+        'task': 'accounts.tasks.roll_balance_checkpoints',
+        'schedule': crontab(minute=15),  # Run hourly
+    },
+    'archive-transactions-monthly': {
+        'task': 'accounts.tasks.archive_transactions',
+        'schedule': crontab(day_of_month=1, hour=2, minute=30),  # Run monthly, after the checkpoint roll-up
+    },
+}
+
+# Ledger: Transaction rows are an append-only journal; balances are checkpointed
+# by accounts.tasks.roll_balance_checkpoints (see accounts/journal.py)
+LEDGER_APPEND_ONLY = True
+# Entries younger than this are left for the next roll-up so that transactions
+# still in flight when the watermark is taken are never skipped
+LEDGER_CHECKPOINT_LAG_SECONDS = 300
+
+# Transaction history pagination (keyset, see accounts/pagination.py)
+TRANSACTION_PAGE_SIZE = 50
+TRANSACTION_MAX_PAGE_SIZE = 500
+
+# Whole months older than this move to ArchivedTransaction, this many rows per
+# batch; history pages and statements still show them (see accounts/archive.py)
+TRANSACTION_ARCHIVE_MONTHS = int(os.getenv('TRANSACTION_ARCHIVE_MONTHS', '12'))
+TRANSACTION_ARCHIVE_BATCH_SIZE = 5000
+
+# Account numbers are handed out from per-process blocks (see accounts/numbering.py)
+ACCOUNT_NUMBER_BLOCK_SIZE = 100
+
+# Per-request query counts, DB time and repeated queries: 'headers', 'log',
+# 'headers,log' or '' to switch the middleware off (see accounts/middleware.py)
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'headers' if DEBUG else '')
+
+# In-process metrics, scraped from /accounts/metrics/ by staff (see accounts/metrics.py)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+
+# Opt-in profiling of sampled requests and Celery tasks (see accounts/profiling.py).
+# With no sample rate, token or task list nothing is installed.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_TASKS = [name for name in os.getenv('PROFILING_TASKS', '').split(',') if name]
+PROFILING_TASK_SAMPLE_RATE = float(os.getenv('PROFILING_TASK_SAMPLE_RATE', '1'))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')  # or 'sampler'
+PROFILING_INTERVAL = 0.005  # seconds between stack samples in 'sampler' mode
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'accounts.queries': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 # Internationalization